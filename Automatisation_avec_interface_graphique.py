@@ -1,13 +1,2092 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
+from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog
 import time
 import threading
 import json
 import os
+import sys
 import math
+import queue
+import heapq
+import io
+import shutil
+import re
+import ipaddress
+import random
+import fnmatch
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from virl2_client import ClientLibrary
 from netmiko import ConnectHandler, NetmikoAuthenticationException
 
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel: la disposition par forces a un repli en Python pur
+    np = None
+
+try:
+    import yaml
+except ImportError:  # PyYAML n'est requis que pour le format de labo CML
+    yaml = None
+
+# Journaux à côté du script, quel que soit le répertoire de lancement
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+
+class LogBuffer:
+    """Journal à mémoire bornée derrière un widget texte
+    
+    Tout le texte est ajouté à un fichier journal ouvert en ajout: les
+    sessions précédentes sont conservées, chacune précédée d'un en-tête
+    daté. Le widget ne conserve que les max_lines dernières lignes. Les
+    exports sont copiés depuis le fichier (session en cours, depuis le
+    dernier effacement), pas depuis le widget. Si le fichier ne peut pas
+    être ouvert (installation en lecture seule), le journal est conservé
+    en mémoire et error contient la cause.
+    """
+    
+    def __init__(self, widget, log_path, max_lines=2000):
+        self.widget = widget
+        self.log_path = log_path
+        self.max_lines = max_lines
+        
+        self.error = None
+        try:
+            log_dir = os.path.dirname(log_path)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            self._file = open(log_path, 'ab')
+        except OSError as e:
+            self.error = e
+            self._file = io.BytesIO()
+        self._file.write(f"\n===== Session du {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n".encode('utf-8'))
+        self._file.flush()
+        self._start = self._file.tell()  # Début de la partie exportable du journal
+    
+    def append(self, text):
+        """Ajoute du texte au journal puis au widget, en éliminant les lignes anciennes"""
+        self._file.write(text.encode('utf-8'))
+        self._file.flush()
+        
+        self.widget.insert(tk.END, text)
+        line_count = int(self.widget.index("end-1c").split('.')[0])
+        if line_count > self.max_lines:
+            self.widget.delete("1.0", f"{line_count - self.max_lines + 1}.0")
+        self.widget.see(tk.END)
+    
+    def clear(self):
+        """Vide le widget; le fichier est conservé, les exports repartent d'ici"""
+        self.widget.delete(1.0, tk.END)
+        self._start = self._file.tell()
+    
+    def is_empty(self):
+        """Indique si rien n'a été journalisé depuis l'ouverture ou le dernier effacement"""
+        return self._file.tell() == self._start
+    
+    def export(self, file_path):
+        """Copie le journal depuis l'ouverture ou le dernier effacement vers file_path, par blocs"""
+        self._file.flush()
+        if self.error is not None:
+            with open(file_path, 'wb') as dest:
+                dest.write(self._file.getbuffer()[self._start:])
+            return
+        with open(self.log_path, 'rb') as source, open(file_path, 'wb') as dest:
+            source.seek(self._start)
+            shutil.copyfileobj(source, dest)
+    
+    def close(self):
+        """Ferme le fichier journal"""
+        self._file.close()
+
+class UIDispatcher:
+    """File d'événements UI alimentée par les threads de travail
+    
+    Les threads ne touchent jamais directement aux widgets: ils déposent
+    des événements que la boucle Tk vide à chaque tick after(). Les
+    ajouts de texte d'un même journal sont regroupés en un seul, et
+    seul le dernier appel d'une même clé (barre de statut, ligne de
+    tableau...) est exécuté.
+    """
+    
+    def __init__(self, root, interval=50, max_events=5000):
+        self.root = root
+        self.interval = interval
+        self.max_events = max_events
+        self._queue = queue.SimpleQueue()
+        self._main_thread = threading.current_thread()
+    
+    def start(self):
+        """Démarre la vidange périodique de la file"""
+        self.root.after(self.interval, self._drain)
+    
+    def in_main_thread(self):
+        """Indique si l'appelant est le thread de la boucle Tk"""
+        return threading.current_thread() is self._main_thread
+    
+    def post_text(self, log, text):
+        """Ajoute du texte à la fin d'un journal (LogBuffer)"""
+        self._queue.put(("text", log, text))
+    
+    def call(self, func, *args, key=None, **kwargs):
+        """Exécute func dans la boucle Tk; un seul appel par clé et par tick"""
+        self._queue.put(("call", key if key is not None else object(), (func, args, kwargs)))
+    
+    def run_sync(self, func, *args, **kwargs):
+        """Exécute func dans la boucle Tk et attend son résultat"""
+        if self.in_main_thread():
+            return func(*args, **kwargs)
+        
+        done = threading.Event()
+        result = {}
+        
+        def wrapper():
+            try:
+                result["value"] = func(*args, **kwargs)
+            except Exception as e:
+                result["error"] = e
+            finally:
+                done.set()
+        
+        self.call(wrapper)
+        done.wait()
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+    
+    def _drain(self):
+        """Vide la file: textes regroupés par journal puis appels dédupliqués"""
+        # Replanifier d'abord: une boîte de dialogue modale ne bloque pas la file
+        self.root.after(self.interval, self._drain)
+        
+        texts = {}
+        calls = {}
+        try:
+            for _ in range(self.max_events):
+                kind, target, payload = self._queue.get_nowait()
+                if kind == "text":
+                    texts.setdefault(target, []).append(payload)
+                else:
+                    calls[target] = payload
+        except queue.Empty:
+            pass
+        
+        for log, parts in texts.items():
+            try:
+                log.append("".join(parts))
+            except tk.TclError:
+                pass  # Widget détruit entre-temps
+        
+        for func, args, kwargs in calls.values():
+            try:
+                func(*args, **kwargs)
+            except tk.TclError:
+                pass  # Fenêtre fermée entre-temps
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+
+class ConsoleEngine:
+    """Pilote une console d'équipement à partir de son prompt
+    
+    Chaque lecture s'arrête dès que le prompt attendu apparaît (ou à
+    l'échéance), au lieu d'attendre un délai fixe. Les pages --More-- sont
+    avancées automatiquement.
+    """
+    
+    SERVER = "server"          # prompt du serveur de consoles CML
+    USERNAME = "username"
+    PASSWORD = "password"
+    USER_EXEC = "user_exec"    # >
+    PRIV_EXEC = "priv_exec"    # #
+    CONFIG = "config"          # (config)#
+    SHELL = "shell"            # $ (Linux)
+    MORE = "more"              # --More--
+    CONFIRM = "confirm"        # [confirm], [startup-config]?
+    DIALOG = "dialog"          # [yes/no]:
+    
+    EXEC_STATES = (USER_EXEC, PRIV_EXEC, CONFIG, SHELL)
+    
+    # Ordre significatif: le premier motif reconnu sur la dernière ligne l'emporte
+    PATTERNS = [
+        (SERVER, re.compile(r'^consoles>\s*$')),
+        (MORE, re.compile(r'-+\s*[Mm]ore\s*-+')),
+        (USERNAME, re.compile(r'(?:[Uu]ser(?:name)?|[Ll]ogin)\s*:\s*$')),
+        (PASSWORD, re.compile(r'[Pp]ass(?:word)?\s*:\s*$')),
+        (DIALOG, re.compile(r'\[yes/no\]\s*:?\s*$')),
+        (CONFIRM, re.compile(r'\[confirm\]\s*$|\]\?\s*$')),
+        (CONFIG, re.compile(r'^\S+\(config[^)]*\)#\s*$')),
+        (PRIV_EXEC, re.compile(r'^[\w.\-@:/~\[\]]+#\s*$')),
+        (USER_EXEC, re.compile(r'^[\w.\-@:/~\[\]]+>\s*$')),
+        (SHELL, re.compile(r'^\S+\$\s*$')),
+    ]
+    
+    MORE_MARKER = re.compile(r' ?-+\s*[Mm]ore\s*-+ ?')
+    ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+    
+    # Prompt en début de ligne, suivi de l'écho de la commande suivante
+    PROMPT_LINE = re.compile(r'^[\w.\-@:/~\[\]]+(?:\([^)]*\))?[#>]', re.M)
+    CONFIG_ERROR = re.compile(r'%\s*(?:Invalid input|Incomplete command|Ambiguous command|Unknown command)[^\n]*')
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.state = None
+        self.prompt = ""
+        self.last_output = ""
+        self.timed_out = False
+    
+    def write(self, data):
+        """Écrit sur la console"""
+        self.connection.write_channel(data)
+    
+    def detect_state(self, buffer):
+        """Retourne l'état correspondant à la dernière ligne du tampon"""
+        last_line = self.ANSI_ESCAPE.sub('', buffer.split('\n')[-1]).replace('\r', '')
+        for state, pattern in self.PATTERNS:
+            if pattern.search(last_line):
+                return state
+        return None
+    
+    def read_until(self, states, timeout=30):
+        """Lit jusqu'à l'un des états attendus ou jusqu'à l'échéance
+        
+        Retourne (sortie, état). L'état vaut None si l'échéance est atteinte.
+        """
+        deadline = time.time() + timeout
+        buffer = ""
+        delay = 0.01
+        while True:
+            chunk = self.connection.read_channel()
+            if chunk:
+                buffer += chunk
+                delay = 0.01
+                state = self.detect_state(buffer)
+                if state == self.MORE and self.MORE not in states:
+                    self.write(' ')
+                    buffer = self.MORE_MARKER.sub('', buffer)
+                    continue
+                if state in states:
+                    self.state = state
+                    self.prompt = buffer.split('\n')[-1].strip()
+                    self.last_output = buffer
+                    return buffer, state
+            elif time.time() >= deadline:
+                self.last_output = buffer
+                return buffer, None
+            else:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+    
+    def login(self, username, password, timeout=30):
+        """Authentification pilotée par les prompts Username/Password"""
+        deadline = time.time() + timeout
+        expected = (self.SERVER, self.USERNAME, self.PASSWORD, self.DIALOG, self.CONFIRM) + self.EXEC_STATES
+        password_sent = 0
+        
+        self.write('\r')
+        while time.time() < deadline:
+            _, state = self.read_until(expected, timeout=min(3, max(0.1, deadline - time.time())))
+            if state in self.EXEC_STATES:
+                return True
+            elif state == self.USERNAME:
+                self.write(username + '\r')
+            elif state == self.PASSWORD:
+                if password_sent >= 2:
+                    return False  # Identifiants refusés
+                password_sent += 1
+                self.write(password + '\r')
+            elif state == self.DIALOG:
+                self.write('no\r')
+            elif state == self.SERVER:
+                return False  # La console du nœud n'a pas pu être ouverte
+            else:
+                # Aucun prompt reconnu: réveiller la console
+                self.write('\r')
+        return False
+    
+    def ensure_exec(self):
+        """Quitte le mode configuration si nécessaire"""
+        if self.state == self.CONFIG:
+            self.send_command("end", timeout=10)
+    
+    def disable_paging(self, command="terminal length 0"):
+        """Désactive la pagination de la sortie"""
+        self.send_command(command, timeout=10)
+    
+    def send_command(self, command, timeout=30):
+        """Envoie une commande et lit la sortie jusqu'au retour du prompt"""
+        self.write(command + '\r')
+        expected = self.EXEC_STATES + (self.CONFIRM,)
+        output, state = self.read_until(expected, timeout=timeout)
+        
+        # Confirmation interactive (write memory, copy...): accepter la valeur par défaut
+        while state == self.CONFIRM:
+            self.write('\r')
+            more, state = self.read_until(expected, timeout=timeout)
+            output += more
+        
+        self.timed_out = state is None
+        return self.clean_output(output, command)
+    
+    def enter_config_mode(self, enable_password="", timeout=30):
+        """Passe en mode privilégié puis en mode configuration"""
+        if self.state == self.CONFIG:
+            return True
+        
+        if self.state == self.USER_EXEC:
+            self.write('enable\r')
+            _, state = self.read_until((self.PRIV_EXEC, self.PASSWORD, self.USER_EXEC), timeout=timeout)
+            if state == self.PASSWORD:
+                self.write(enable_password + '\r')
+                self.read_until((self.PRIV_EXEC, self.PASSWORD, self.USER_EXEC), timeout=timeout)
+        
+        self.write('configure terminal\r')
+        _, state = self.read_until(self.EXEC_STATES, timeout=timeout)
+        return state == self.CONFIG
+    
+    def push_config(self, commands, chunk_size=20, idle_timeout=30, progress=None, enable_password=""):
+        """Envoie des lignes de configuration par blocs en mode configuration
+        
+        commands est une liste de (numéro de ligne, commande). Un bloc n'est
+        envoyé qu'une fois l'écho du précédent revenu avec autant de prompts
+        que de lignes. Retourne la liste des erreurs (numéro, commande, message).
+        """
+        errors = []
+        if not self.enter_config_mode(enable_password):
+            return [(0, "configure terminal", "Impossible de passer en mode configuration")]
+        
+        for start in range(0, len(commands), chunk_size):
+            chunk = commands[start:start + chunk_size]
+            self.write(''.join(command + '\r' for _, command in chunk))
+            output = self._read_prompts(len(chunk), idle_timeout)
+            
+            # Chaque segment entre deux prompts correspond à une ligne du bloc
+            parts = self.PROMPT_LINE.split(output)
+            for i, (line_no, command) in enumerate(chunk):
+                if i >= len(parts) - 1:
+                    errors.append((line_no, command, "Pas de réponse de l'équipement"))
+                    continue
+                match = self.CONFIG_ERROR.search(parts[i])
+                if match:
+                    errors.append((line_no, command, match.group(0).strip()))
+            
+            if progress:
+                progress(min(start + chunk_size, len(commands)), len(commands))
+            
+            if len(parts) - 1 < len(chunk):
+                break  # Équipement muet: inutile d'envoyer la suite
+        
+        return errors
+    
+    def _read_prompts(self, count, idle_timeout):
+        """Lit jusqu'à avoir reçu count prompts, ou idle_timeout secondes sans données"""
+        buffer = ""
+        last_data = time.time()
+        delay = 0.01
+        while True:
+            chunk = self.connection.read_channel()
+            if chunk:
+                buffer += self.ANSI_ESCAPE.sub('', chunk).replace('\x08', '').replace('\r', '')
+                last_data = time.time()
+                delay = 0.01
+                state = self.detect_state(buffer)
+                if state == self.MORE:
+                    self.write(' ')
+                    buffer = self.MORE_MARKER.sub('', buffer)
+                elif state == self.CONFIRM:
+                    self.write('\r')
+                elif state == self.DIALOG:
+                    self.write('yes\r')
+                elif state in self.EXEC_STATES and len(self.PROMPT_LINE.findall(buffer)) >= count:
+                    self.state = state
+                    self.last_output = buffer
+                    return buffer
+            elif time.time() - last_data > idle_timeout:
+                self.last_output = buffer
+                return buffer
+            else:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+    
+    def check_prompt(self, timeout=1.5):
+        """Vérifie que la console répond avec un prompt d'exécution"""
+        self.write('\r')
+        _, state = self.read_until(self.EXEC_STATES, timeout=timeout)
+        if state is None:
+            return False
+        self.ensure_exec()
+        return True
+    
+    def clean_output(self, output, command):
+        """Retire l'écho de la commande, le prompt final et les séquences de contrôle"""
+        output = self.ANSI_ESCAPE.sub('', output).replace('\x08', '').replace('\r', '')
+        lines = output.split('\n')
+        if lines and lines[0].strip().endswith(command.strip()):
+            lines = lines[1:]
+        if lines and self.detect_state(lines[-1]) in self.EXEC_STATES:
+            lines = lines[:-1]
+        return '\n'.join(lines)
+    
+    def is_alive(self):
+        """Indique si la connexion SSH sous-jacente est ouverte"""
+        return self.connection.is_alive()
+    
+    def disconnect(self):
+        """Ferme la connexion"""
+        self.connection.disconnect()
+
+class ConsoleSessionPool:
+    """Pool de sessions console authentifiées, indexées par (lab, nœud, ligne)
+    
+    Une session n'est prêtée qu'à une tâche à la fois; elle est vérifiée
+    avant chaque prêt et fermée après idle_ttl secondes d'inactivité.
+    """
+    
+    def __init__(self, idle_ttl=300):
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._idle = {}        # clé -> (connexion, dernière utilisation)
+        self._key_locks = {}   # clé -> verrou, une seule tâche par console
+        self._janitor = None
+        self._stop = threading.Event()
+    
+    @contextmanager
+    def session(self, key, connect):
+        """Prête la session de la clé, ou en ouvre une avec connect()"""
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            connection = self._checkout(key)
+            if connection is None:
+                connection = connect()
+            
+            try:
+                yield connection
+            except Exception:
+                # État de la console inconnu: ne pas la remettre dans le pool
+                self._close(connection)
+                raise
+            
+            if connection is not None:
+                self._checkin(key, connection)
+    
+    def _checkout(self, key):
+        """Retire une session inactive du pool si elle est encore valide"""
+        with self._lock:
+            entry = self._idle.pop(key, None)
+        if entry is None:
+            return None
+        
+        connection = entry[0]
+        if self.is_healthy(connection):
+            return connection
+        self._close(connection)
+        return None
+    
+    def _checkin(self, key, connection):
+        """Remet une session dans le pool"""
+        with self._lock:
+            self._idle[key] = (connection, time.time())
+            if self._janitor is None:
+                self._janitor = threading.Thread(target=self._janitor_loop)
+                self._janitor.daemon = True
+                self._janitor.start()
+    
+    def is_healthy(self, connection):
+        """Vérifie que la session répond encore avec un prompt"""
+        try:
+            return connection.is_alive() and connection.check_prompt()
+        except Exception:
+            return False
+    
+    def evict_idle(self):
+        """Ferme les sessions inactives depuis plus de idle_ttl secondes"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, last_used) in self._idle.items()
+                       if now - last_used > self.idle_ttl]
+            connections = [self._idle.pop(key)[0] for key in expired]
+        for connection in connections:
+            self._close(connection)
+    
+    def close_lab(self, lab_id):
+        """Ferme toutes les sessions inactives d'un lab"""
+        with self._lock:
+            keys = [key for key in self._idle if key[0] == lab_id]
+            connections = [self._idle.pop(key)[0] for key in keys]
+        for connection in connections:
+            self._close(connection)
+    
+    def close_node(self, lab_id, node_label):
+        """Ferme les sessions inactives d'un nœud (toutes lignes)"""
+        with self._lock:
+            keys = [key for key in self._idle if key[:2] == (lab_id, node_label)]
+            connections = [self._idle.pop(key)[0] for key in keys]
+        for connection in connections:
+            self._close(connection)
+    
+    def close_all(self):
+        """Ferme toutes les sessions et arrête le nettoyage périodique"""
+        self._stop.set()
+        with self._lock:
+            connections = [connection for connection, _ in self._idle.values()]
+            self._idle.clear()
+        for connection in connections:
+            self._close(connection)
+    
+    def _janitor_loop(self):
+        """Nettoyage périodique des sessions expirées"""
+        while not self._stop.wait(min(30, max(1, self.idle_ttl / 2))):
+            self.evict_idle()
+    
+    @staticmethod
+    def _close(connection):
+        """Ferme une session sans propager les erreurs"""
+        if connection is None:
+            return
+        try:
+            connection.disconnect()
+        except Exception:
+            pass
+
+class LabCollector:
+    """Arrêt, effacement et suppression concurrents de labs CML
+    
+    Chaque lab est traité par un worker: arrêt sans attente, puis état
+    resynchronisé avec un intervalle croissant (0,2 s au départ, 5 s au
+    plus) jusqu'à STOPPED, effacement attendu de la même façon jusqu'à
+    DEFINED_ON_CORE, puis suppression. on_progress(lab, étape)
+    est appelé à chaque étape, depuis les workers.
+    """
+    
+    STOPPED_STATES = ("STOPPED", "DEFINED_ON_CORE")
+    
+    def __init__(self, max_workers=8, timeout=300, on_progress=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.on_progress = on_progress
+    
+    @staticmethod
+    def lab_state(lab):
+        """État courant du lab, lu sur le contrôleur
+        
+        Lab.state() interroge le serveur (ou le cache alimenté par les
+        événements); les anciens clients n'exposent qu'une propriété, mise à
+        jour par sync_states().
+        """
+        if callable(lab.state):
+            return lab.state()
+        lab.sync_states()
+        return lab.state
+    
+    @staticmethod
+    def lab_age(lab, now=None):
+        """Âge du lab en secondes, ou None si la date de création est inconnue"""
+        try:
+            created = lab.details().get("created")
+            created = datetime.fromisoformat(created.replace("Z", "+00:00"))
+        except Exception:
+            return None
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        return ((now or datetime.now(timezone.utc)) - created).total_seconds()
+    
+    def matching(self, labs, pattern="*", min_age=0):
+        """Labs dont le titre correspond au motif et plus anciens que min_age secondes"""
+        selected = []
+        now = datetime.now(timezone.utc)
+        for lab in labs:
+            if not fnmatch.fnmatchcase(lab.title, pattern):
+                continue
+            if min_age > 0:
+                age = self.lab_age(lab, now)
+                if age is None or age < min_age:
+                    continue
+            selected.append(lab)
+        return selected
+    
+    def collect(self, labs):
+        """Supprime les labs; retourne {id du lab: erreur ou None}"""
+        labs = list(labs)
+        results = {}
+        if not labs:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(labs))) as executor:
+            futures = {executor.submit(self._collect_one, lab): lab for lab in labs}
+            for future in as_completed(futures):
+                lab = futures[future]
+                try:
+                    future.result()
+                    results[lab.id] = None
+                except Exception as e:
+                    results[lab.id] = str(e)
+        return results
+    
+    def collect_in_background(self, labs, on_done=None):
+        """Lance collect() dans un thread; on_done(résultats) est appelé à la fin"""
+        def run():
+            results = self.collect(labs)
+            if on_done:
+                on_done(results)
+        
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        return thread
+    
+    def wait_for_state(self, get_state, states, what):
+        """Attend que get_state() retourne un des états, avec intervalle croissant
+        
+        TimeoutError après self.timeout secondes.
+        """
+        deadline = time.time() + self.timeout
+        interval = 0.2
+        while True:
+            state = get_state()
+            if state in states:
+                return state
+            if time.time() > deadline:
+                raise TimeoutError(f"{what} toujours {state} après {self.timeout} s")
+            time.sleep(interval)
+            interval = min(interval * 1.5, 5)
+    
+    def _progress(self, lab, step):
+        if self.on_progress:
+            self.on_progress(lab, step)
+    
+    def _collect_one(self, lab):
+        what = f"lab '{lab.title}'"
+        if self.lab_state(lab) not in self.STOPPED_STATES:
+            self._progress(lab, "arrêt")
+            lab.stop(wait=False)
+            self.wait_for_state(lambda: self.lab_state(lab), self.STOPPED_STATES, what)
+        
+        if self.lab_state(lab) != "DEFINED_ON_CORE":
+            self._progress(lab, "effacement")
+            lab.wipe(wait=False)
+            self.wait_for_state(lambda: self.lab_state(lab), ("DEFINED_ON_CORE",), what)
+        lab.remove()
+        self._progress(lab, "supprimé")
+
+class UnionFind:
+    """Ensembles disjoints (union par taille, compression de chemin)"""
+    
+    def __init__(self, items=()):
+        self.parent = {item: item for item in items}
+        self.size = {item: 1 for item in self.parent}
+    
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+    
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return True
+    
+    def groups(self):
+        """Ensembles, dans l'ordre d'insertion de leur premier élément"""
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+class NodeRecord:
+    """Équipement de la topologie"""
+    
+    __slots__ = ("name", "type", "category", "interfaces", "configuration")
+    
+    def __init__(self, name, device_type, category="Autre", interfaces=None, configuration=None):
+        self.name = name
+        self.type = device_type
+        self.category = category
+        self.interfaces = interfaces if interfaces is not None else {}
+        self.configuration = configuration  # Configuration de démarrage (labos CML importés)
+    
+    def to_dict(self):
+        data = {"type": self.type, "category": self.category, "interfaces": self.interfaces}
+        if self.configuration:
+            data["configuration"] = self.configuration
+        return data
+
+class LinkRecord:
+    """Connexion entre un port de deux équipements"""
+    
+    __slots__ = ("source", "port_s", "dest", "port_d", "cost")
+    
+    def __init__(self, source, port_s, dest, port_d, cost=None):
+        self.source = source
+        self.port_s = port_s
+        self.dest = dest
+        self.port_d = port_d
+        self.cost = cost  # Coût optionnel pour les calculs de chemin (1 par défaut)
+    
+    @property
+    def key(self):
+        return (self.source, self.port_s, self.dest, self.port_d)
+    
+    @property
+    def pair(self):
+        """Paire d'extrémités, indépendante du sens"""
+        return (self.source, self.dest) if self.source <= self.dest else (self.dest, self.source)
+    
+    def other(self, node):
+        """Extrémité opposée à node"""
+        return self.dest if node == self.source else self.source
+    
+    def to_dict(self):
+        data = {"source": self.source, "port_s": self.port_s,
+                "dest": self.dest, "port_d": self.port_d}
+        if self.cost is not None:
+            data["cost"] = self.cost
+        return data
+
+class TopologyModel:
+    """État de la topologie, indexé pour les vérifications et les vues
+    
+    Les connexions sont indexées par nœud, par (nœud, port) et par paire
+    d'extrémités: doublons et conflits de ports se vérifient en O(1), la
+    suppression d'un nœud coûte O(degré). Les vues s'abonnent avec
+    subscribe(callback) et reçoivent (événement, enregistrement) pour
+    "node_added", "node_removed", "link_added", "link_removed",
+    "link_changed", ou ("reset", None) après load().
+    """
+    
+    def __init__(self):
+        self.nodes = {}      # nom -> NodeRecord
+        self.links = {}      # (source, port_s, dest, port_d) -> LinkRecord
+        self.by_node = {}    # nom -> clés des connexions incidentes
+        self.by_port = {}    # (nom, port) -> clés des connexions sur ce port
+        self.by_pair = {}    # (nom, nom) trié -> clés des connexions entre ces nœuds
+        self._listeners = []
+    
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+    
+    def _notify(self, event, record):
+        for callback in self._listeners:
+            callback(event, record)
+    
+    def add_node(self, name, device_type, category="Autre", interfaces=None, configuration=None,
+                 notify=True):
+        """Ajoute un équipement; ValueError si le nom existe déjà"""
+        if name in self.nodes:
+            raise ValueError(f"Un équipement nommé '{name}' existe déjà")
+        record = NodeRecord(name, device_type, category, interfaces, configuration)
+        self.nodes[name] = record
+        if notify:
+            self._notify("node_added", record)
+        return record
+    
+    def remove_node(self, name):
+        """Supprime un équipement et ses connexions"""
+        for key in list(self.by_node.get(name, ())):
+            self.remove_link(key)
+        record = self.nodes.pop(name)
+        self._notify("node_removed", record)
+        return record
+    
+    def has_link(self, key):
+        return key in self.links
+    
+    def port_in_use(self, node, port):
+        return bool(self.by_port.get((node, port)))
+    
+    def links_of(self, node):
+        """Connexions incidentes à un nœud"""
+        return [self.links[key] for key in self.by_node.get(node, ())]
+    
+    def neighbours(self, node):
+        return [self.links[key].other(node) for key in self.by_node.get(node, ())]
+    
+    def add_link(self, source, port_s, dest, port_d, cost=None, notify=True):
+        """Ajoute une connexion; ValueError si un équipement est inconnu ou si elle existe"""
+        for node in (source, dest):
+            if node not in self.nodes:
+                raise ValueError(f"Équipement inconnu: {node}")
+        record = LinkRecord(source, port_s, dest, port_d, cost)
+        key = record.key
+        if key in self.links:
+            raise ValueError("Cette connexion existe déjà")
+        
+        self.links[key] = record
+        self.by_node.setdefault(source, set()).add(key)
+        self.by_node.setdefault(dest, set()).add(key)
+        self.by_port.setdefault((source, port_s), set()).add(key)
+        self.by_port.setdefault((dest, port_d), set()).add(key)
+        self.by_pair.setdefault(record.pair, set()).add(key)
+        if notify:
+            self._notify("link_added", record)
+        return record
+    
+    def set_link_cost(self, key, cost):
+        """Change le coût d'une connexion (None: coût par défaut)"""
+        record = self.links[key]
+        record.cost = cost
+        self._notify("link_changed", record)
+    
+    def remove_link(self, key):
+        """Supprime une connexion par sa clé"""
+        record = self.links.pop(key)
+        for index, index_key in ((self.by_node, record.source), (self.by_node, record.dest),
+                                 (self.by_port, (record.source, record.port_s)),
+                                 (self.by_port, (record.dest, record.port_d)),
+                                 (self.by_pair, record.pair)):
+            keys = index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[index_key]
+        self._notify("link_removed", record)
+        return record
+    
+    def analyze(self):
+        """Analyse de connectivité en un passage O(N + E)
+        
+        Retourne un dict avec:
+        - components: listes de nœuds connexes, la plus grande en premier
+        - port_conflicts: [(nœud, port, clés)] pour les ports portant plusieurs connexions
+        - self_loops: clés des connexions d'un nœud vers lui-même
+        - parallel_links: [(paire, clés)] pour les paires reliées plusieurs fois
+        """
+        sets = UnionFind(self.nodes)
+        self_loops = []
+        for key, link in self.links.items():
+            if link.source == link.dest:
+                self_loops.append(key)
+            else:
+                sets.union(link.source, link.dest)
+        
+        components = sorted(sets.groups(), key=len, reverse=True)
+        port_conflicts = [(node, port, sorted(keys, key=str))
+                          for (node, port), keys in self.by_port.items() if len(keys) > 1]
+        parallel_links = [(pair, sorted(keys, key=str))
+                          for pair, keys in self.by_pair.items()
+                          if len(keys) > 1 and pair[0] != pair[1]]
+        return {
+            "components": components,
+            "port_conflicts": port_conflicts,
+            "self_loops": self_loops,
+            "parallel_links": parallel_links
+        }
+    
+    def critical_elements(self):
+        """Points d'articulation et ponts (Tarjan itératif, O(N + E))
+        
+        Retourne (articulations, ponts): {nœud: équipements coupés} et
+        {clé: équipements coupés}, où « équipements coupés » compte les
+        nœuds séparés du reste par la panne. Les liens parallèles ne sont
+        pas des ponts; les boucles sont ignorées.
+        """
+        index = {}
+        low = {}
+        size = {}
+        articulations = {}
+        bridges = {}
+        counter = 0
+        
+        for root in self.nodes:
+            if root in index:
+                continue
+            index[root] = low[root] = counter
+            size[root] = 1
+            counter += 1
+            root_cuts = []
+            # Pile: (nœud, clé de la connexion d'arrivée, connexions restantes)
+            stack = [(root, None, iter(self.by_node.get(root, ())))]
+            
+            while stack:
+                node, parent_key, remaining = stack[-1]
+                descended = False
+                for key in remaining:
+                    if key == parent_key:
+                        continue
+                    link = self.links[key]
+                    if link.source == link.dest:
+                        continue
+                    other = link.other(node)
+                    if other in index:
+                        low[node] = min(low[node], index[other])
+                    else:
+                        index[other] = low[other] = counter
+                        size[other] = 1
+                        counter += 1
+                        stack.append((other, key, iter(self.by_node.get(other, ()))))
+                        descended = True
+                        break
+                if descended:
+                    continue
+                
+                stack.pop()
+                if not stack:
+                    break
+                parent = stack[-1][0]
+                low[parent] = min(low[parent], low[node])
+                size[parent] += size[node]
+                if low[node] > index[parent]:
+                    bridges[parent_key] = size[node]
+                if len(stack) == 1:
+                    root_cuts.append(size[node])
+                elif low[node] >= index[parent]:
+                    articulations[parent] = articulations.get(parent, 0) + size[node]
+            
+            # La racine est une articulation si elle a plusieurs sous-arbres:
+            # sa panne isole tous les sous-arbres sauf le plus grand
+            if len(root_cuts) > 1:
+                articulations[root] = sum(root_cuts) - max(root_cuts)
+        
+        return articulations, bridges
+    
+    def diff(self, nodes, links):
+        """Écart entre le modèle et une topologie existante (lab CML)
+        
+        nodes: {nom: type}; links: extrémités {(nœud, port), (nœud, port)}
+        exprimées avec les noms de ports du modèle. Un nœud dont le type a
+        changé est remplacé. Retourne les nœuds et liens à créer ou à
+        supprimer; les liens des nœuds supprimés sont inclus.
+        """
+        add_nodes = [name for name, record in self.nodes.items()
+                     if name not in nodes or nodes[name] != record.type]
+        remove_nodes = [name for name, device_type in nodes.items()
+                        if name not in self.nodes or self.nodes[name].type != device_type]
+        replaced = set(remove_nodes)
+        
+        local = {}
+        for record in self.links.values():
+            local[frozenset(((record.source, record.port_s), (record.dest, record.port_d)))] = record
+        
+        def kept(endpoints):
+            return not any(node in replaced for node, _ in endpoints)
+        
+        add_links = [record for endpoints, record in local.items()
+                     if endpoints not in links or not kept(endpoints)]
+        remove_links = [endpoints for endpoints in links
+                        if endpoints not in local or not kept(endpoints)]
+        return {"add_nodes": add_nodes, "remove_nodes": remove_nodes,
+                "add_links": add_links, "remove_links": remove_links}
+    
+    def load(self, nodes, connections):
+        """Remplace la topologie (format JSON d'export) et notifie un "reset"
+        
+        Retourne la liste des connexions ignorées (équipement inconnu ou doublon).
+        """
+        self.nodes.clear()
+        self.links.clear()
+        self.by_node.clear()
+        self.by_port.clear()
+        self.by_pair.clear()
+        
+        for name, info in nodes.items():
+            self.add_node(name, info["type"], info.get("category", "Autre"),
+                          info.get("interfaces", {}), info.get("configuration"), notify=False)
+        skipped = []
+        for conn in connections:
+            try:
+                self.add_link(conn["source"], conn["port_s"], conn["dest"], conn["port_d"],
+                              conn.get("cost"), notify=False)
+            except ValueError as e:
+                skipped.append(f"{conn['source']}:{conn['port_s']} -> {conn['dest']}:{conn['port_d']} ({e})")
+        self._notify("reset", None)
+        return skipped
+    
+    def to_dict(self):
+        """Sérialise la topologie au format JSON d'export"""
+        return {
+            "nodes": {name: record.to_dict() for name, record in self.nodes.items()},
+            "connections": [record.to_dict() for record in self.links.values()]
+        }
+
+class CMLLabFormat:
+    """Conversion entre le modèle de topologie et le format de labo CML
+    
+    Le document YAML est lu une seule fois (chargeur C de PyYAML s'il est
+    disponible) puis parcouru en une passe: les nœuds, puis les liens
+    résolus par (id nœud, id interface). Les interfaces du modèle associent
+    leur label au slot (int) ou au type pour les interfaces non physiques.
+    Un port numérique du modèle (numéro de slot saisi dans l'interface
+    graphique) est exporté sans label, le serveur appliquant celui de la
+    définition de nœud, et relu comme entier.
+    """
+    
+    VERSION = "0.2.2"
+    
+    @staticmethod
+    def read(file_path):
+        """Charge un fichier YAML de labo CML"""
+        if yaml is None:
+            raise RuntimeError("PyYAML est requis pour le format CML (pip install pyyaml)")
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        with open(file_path, "r", encoding="utf-8") as f:
+            return yaml.load(f, Loader=loader)
+    
+    @staticmethod
+    def write(file_path, document):
+        """Écrit un document de labo CML en YAML"""
+        if yaml is None:
+            raise RuntimeError("PyYAML est requis pour le format CML (pip install pyyaml)")
+        dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+        with open(file_path, "w", encoding="utf-8") as f:
+            yaml.dump(document, f, Dumper=dumper, sort_keys=False, default_flow_style=False,
+                      allow_unicode=True)
+    
+    @staticmethod
+    def parse(document, categories=None):
+        """Retourne (titre, nœuds, connexions, positions) au format du modèle
+        
+        categories: {type de nœud: catégorie} pour classer les équipements.
+        positions ne contient que les nœuds ayant des coordonnées.
+        """
+        categories = categories or {}
+        nodes = {}
+        positions = {}
+        endpoints = {}  # (id nœud, id interface) -> (label nœud, label interface)
+        
+        for node in document.get("nodes") or ():
+            name = node["label"]
+            interfaces = {}
+            for intf in node.get("interfaces") or ():
+                slot = intf.get("slot")
+                label = intf.get("label") or (str(slot) if slot is not None else intf["id"])
+                interfaces[label] = slot if slot is not None else intf.get("type", "physical")
+                port = slot if slot is not None and label == str(slot) else label
+                endpoints[(node["id"], intf["id"])] = (name, port)
+            
+            configuration = node.get("configuration")
+            if isinstance(configuration, list):
+                # CML 2.7+: liste de fichiers {name, content}
+                configuration = "\n".join(part.get("content") or "" for part in configuration)
+            
+            nodes[name] = {"type": node["node_definition"],
+                           "category": categories.get(node["node_definition"], "Autre"),
+                           "interfaces": interfaces,
+                           "configuration": configuration or None}
+            if "x" in node or "y" in node:
+                positions[name] = (node.get("x", 0), node.get("y", 0))
+        
+        connections = []
+        for link in document.get("links") or ():
+            source, port_s = endpoints[(link["n1"], link["i1"])]
+            dest, port_d = endpoints[(link["n2"], link["i2"])]
+            connections.append({"source": source, "port_s": port_s, "dest": dest, "port_d": port_d})
+        
+        title = (document.get("lab") or {}).get("title") or document.get("lab_title")
+        return title, nodes, connections, positions
+    
+    @staticmethod
+    def port_slots(model, links=None):
+        """Slot d'interface de chaque extrémité de connexion: {(nœud, port): slot}
+        
+        Un port garde le slot connu du nœud; sinon le port lui-même s'il est
+        numérique et libre, à défaut le premier slot libre. Les ports
+        numériques sont servis avant les labels pour garder leur numéro.
+        """
+        slots = {}
+        used_slots = {}
+        pending = []
+        for conn in (model.links.values() if links is None else links):
+            for node_name, port in ((conn.source, conn.port_s), (conn.dest, conn.port_d)):
+                if (node_name, port) in slots:
+                    continue
+                used = used_slots.get(node_name)
+                if used is None:
+                    used = used_slots[node_name] = {slot for slot in model.nodes[node_name].interfaces.values()
+                                                    if isinstance(slot, int)}
+                slot = model.nodes[node_name].interfaces.get(str(port))
+                if not isinstance(slot, int):
+                    if not str(port).isdigit() or int(port) in used:
+                        pending.append((node_name, port))
+                        slot = None
+                    else:
+                        slot = int(port)
+                        used.add(slot)
+                slots[(node_name, port)] = slot
+        
+        for node_name, port in pending:
+            used = used_slots[node_name]
+            slot = 0
+            while slot in used:
+                slot += 1
+            used.add(slot)
+            slots[(node_name, port)] = slot
+        return slots
+    
+    @staticmethod
+    def build(title, model, positions):
+        """Document de labo CML pour un modèle de topologie
+        
+        Les interfaces physiques sont émises par slot croissant et sans trou;
+        seules celles dont le label est connu en portent un. Les types autres
+        que physique ou loopback sont ignorés.
+        """
+        slots = CMLLabFormat.port_slots(model)
+        ports_by_node = {}
+        for (node_name, port), slot in slots.items():
+            ports_by_node.setdefault(node_name, {})[port] = slot
+        
+        nodes = {}
+        interface_ids = {}
+        for index, (name, record) in enumerate(model.nodes.items()):
+            x, y = positions.get(name, (0, 0))
+            labels = {}
+            interfaces = []
+            for label, slot in record.interfaces.items():
+                if isinstance(slot, int):
+                    labels.setdefault(slot, label)
+                elif slot == "loopback":
+                    interfaces.append({"id": f"i{len(interfaces)}", "label": label, "type": "loopback"})
+            
+            ports = ports_by_node.get(name, {})
+            for port, slot in ports.items():
+                if not str(port).isdigit():
+                    labels.setdefault(slot, str(port))
+            
+            slot_ids = {}
+            for slot in range(max(list(labels) + list(ports.values()), default=-1) + 1):
+                intf = {"id": f"i{len(interfaces)}"}
+                if slot in labels and labels[slot] != str(slot):
+                    intf["label"] = labels[slot]
+                intf["slot"] = slot
+                intf["type"] = "physical"
+                slot_ids[slot] = intf["id"]
+                interfaces.append(intf)
+            for port, slot in ports.items():
+                interface_ids[(name, port)] = slot_ids[slot]
+            
+            nodes[name] = {
+                "id": f"n{index}",
+                "label": name,
+                "node_definition": record.type,
+                "x": int(round(x)),
+                "y": int(round(y)),
+                "configuration": record.configuration or "",
+                "tags": [],
+                "interfaces": interfaces
+            }
+        
+        links = []
+        for index, conn in enumerate(model.links.values()):
+            links.append({
+                "id": f"l{index}",
+                "n1": nodes[conn.source]["id"],
+                "i1": interface_ids[(conn.source, conn.port_s)],
+                "n2": nodes[conn.dest]["id"],
+                "i2": interface_ids[(conn.dest, conn.port_d)]
+            })
+        
+        return {
+            "lab": {"title": title, "description": "", "notes": "", "version": CMLLabFormat.VERSION},
+            "nodes": list(nodes.values()),
+            "links": links
+        }
+
+class PathEngine:
+    """Plus courts chemins sur le modèle de topologie, avec cache
+    
+    Un arbre de plus courts chemins (BFS en sauts, Dijkstra avec les coûts
+    des liens) est calculé une fois par source puis réutilisé pour toutes
+    les destinations: une requête en cache ne coûte que la longueur du
+    chemin. Une modification n'invalide que le cache des composantes
+    connexes touchées.
+    """
+    
+    def __init__(self, model):
+        self.model = model
+        self.component = {}   # nœud -> identifiant de composante (calculé à la demande)
+        self.members = {}     # identifiant -> nœuds de la composante
+        self.cache = {}       # (source, pondéré, liens exclus) -> (distances, prédécesseurs)
+        self.cached_by_component = {}
+        self._next_component = 0
+        model.subscribe(self.on_change)
+    
+    def on_change(self, event, record):
+        """Invalide les composantes touchées par une modification du modèle"""
+        if event == "reset":
+            self.component.clear()
+            self.members.clear()
+            self.cache.clear()
+            self.cached_by_component.clear()
+        elif event in ("link_added", "link_removed", "link_changed"):
+            self._invalidate(record.source)
+            self._invalidate(record.dest)
+        elif event == "node_removed":
+            self._invalidate(record.name)
+    
+    def _invalidate(self, node):
+        cid = self.component.get(node)
+        if cid is None:
+            return
+        for member in self.members.pop(cid):
+            del self.component[member]
+        for cache_key in self.cached_by_component.pop(cid, ()):
+            self.cache.pop(cache_key, None)
+    
+    def component_of(self, node):
+        """Identifiant de la composante connexe d'un nœud"""
+        cid = self.component.get(node)
+        if cid is not None:
+            return cid
+        
+        cid = self._next_component
+        self._next_component += 1
+        members = {node}
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for neighbour in self.model.neighbours(current):
+                if neighbour not in members:
+                    members.add(neighbour)
+                    stack.append(neighbour)
+        for member in members:
+            self.component[member] = cid
+        self.members[cid] = members
+        return cid
+    
+    def shortest_path(self, source, dest, weighted=False, excluded=()):
+        """Retourne (nœuds, clés des liens, coût) ou None si dest est injoignable
+        
+        excluded: clés de liens considérés comme coupés (analyse « et si »).
+        """
+        if source not in self.model.nodes or dest not in self.model.nodes:
+            return None
+        
+        cache_key = (source, weighted, frozenset(excluded))
+        tree = self.cache.get(cache_key)
+        if tree is None:
+            tree = self._shortest_tree(source, weighted, cache_key[2])
+            self.cache[cache_key] = tree
+            self.cached_by_component.setdefault(self.component_of(source), set()).add(cache_key)
+        
+        distances, previous = tree
+        if dest not in distances:
+            return None
+        
+        nodes, keys = [dest], []
+        while nodes[-1] != source:
+            parent, key = previous[nodes[-1]]
+            nodes.append(parent)
+            keys.append(key)
+        nodes.reverse()
+        keys.reverse()
+        return nodes, keys, distances[dest]
+    
+    def _shortest_tree(self, source, weighted, excluded):
+        """Distances et prédécesseurs (nœud, clé) depuis source"""
+        links = self.model.links
+        by_node = self.model.by_node
+        distances = {source: 0}
+        previous = {}
+        
+        if not weighted:
+            frontier = [source]
+            while frontier:
+                next_frontier = []
+                for node in frontier:
+                    for key in by_node.get(node, ()):
+                        if key in excluded:
+                            continue
+                        other = links[key].other(node)
+                        if other not in distances:
+                            distances[other] = distances[node] + 1
+                            previous[other] = (node, key)
+                            next_frontier.append(other)
+                frontier = next_frontier
+            return distances, previous
+        
+        heap = [(0, 0, source)]
+        done = set()
+        counter = 1
+        while heap:
+            distance, _, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            for key in by_node.get(node, ()):
+                if key in excluded:
+                    continue
+                link = links[key]
+                other = link.other(node)
+                candidate = distance + (link.cost if link.cost is not None else 1)
+                if other not in distances or candidate < distances[other]:
+                    distances[other] = candidate
+                    previous[other] = (node, key)
+                    heapq.heappush(heap, (candidate, counter, other))
+                    counter += 1
+        return distances, previous
+
+class ForceLayout:
+    """Disposition par forces (Fruchterman–Reingold)
+    
+    Les nœuds se repoussent et les connexions les attirent, avec une
+    température décroissante qui borne les déplacements. Avec NumPy, les
+    forces sont vectorisées; au-delà de EXACT_LIMIT nœuds, la répulsion
+    est approchée par une grille: exacte entre cellules voisines, par les
+    centroïdes des cellules au-delà.
+    """
+    
+    EXACT_LIMIT = 400
+    GRAVITY = 1.0
+    
+    def __init__(self, nodes, edges, spacing=180, iterations=60):
+        self.nodes = list(nodes)
+        index = {name: i for i, name in enumerate(self.nodes)}
+        self.edges = [(index[s], index[d]) for s, d in edges
+                      if s in index and d in index and s != d]
+        self.k = spacing
+        self.iterations = iterations
+    
+    def run(self, initial=None, on_step=None, step_every=5, should_stop=None):
+        """Calcule les positions; retourne None si should_stop() devient vrai
+        
+        on_step(positions) est appelé toutes les step_every itérations pour
+        permettre un rendu progressif.
+        """
+        n = len(self.nodes)
+        if n == 0:
+            return {}
+        
+        # Positions de départ: celles connues, sinon aléatoires dans le carré cible
+        side = self.k * math.sqrt(n)
+        rng = random.Random(42)
+        initial = initial or {}
+        start = [initial.get(name) or (rng.uniform(0, side), rng.uniform(0, side))
+                 for name in self.nodes]
+        
+        if np is not None:
+            steps = self._iterate_numpy(start, side)
+        else:
+            steps = self._iterate_python(start, side)
+        
+        positions = None
+        for iteration, coords in steps:
+            if should_stop and should_stop():
+                return None
+            last = iteration == self.iterations - 1
+            if last or (on_step and iteration % step_every == 0):
+                positions = self._to_positions(coords)
+                if on_step:
+                    on_step(positions)
+        return positions
+    
+    def _to_positions(self, coords):
+        """Convertit les coordonnées en positions décalées dans la zone visible"""
+        min_x = min(x for x, _ in coords)
+        min_y = min(y for _, y in coords)
+        return {name: (x - min_x + 100, y - min_y + 100)
+                for name, (x, y) in zip(self.nodes, coords)}
+    
+    def _temperature(self, iteration, side):
+        return side / 10 * (1 - iteration / self.iterations) + 1
+    
+    def _iterate_numpy(self, start, side):
+        pos = np.array(start, dtype=float)
+        n = len(pos)
+        if self.edges:
+            edges = np.array(self.edges, dtype=np.int64)
+            src, dst = edges[:, 0], edges[:, 1]
+        
+        for iteration in range(self.iterations):
+            if n <= self.EXACT_LIMIT:
+                disp = self._repulsion_numpy(pos, pos, np.ones(n))
+            else:
+                disp = self._grid_repulsion_numpy(pos)
+            
+            # Attraction le long des connexions: d²/k
+            if self.edges:
+                delta = pos[src] - pos[dst]
+                dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 0.01)
+                force = delta * (dist / self.k)[:, None]
+                for axis in (0, 1):
+                    disp[:, axis] -= np.bincount(src, weights=force[:, axis], minlength=n)
+                    disp[:, axis] += np.bincount(dst, weights=force[:, axis], minlength=n)
+            
+            # Légère gravité pour garder les composantes isolées à proximité
+            disp -= self.GRAVITY * (pos - pos.mean(axis=0))
+            
+            length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 0.01)
+            step = np.minimum(length, self._temperature(iteration, side))
+            pos += disp * (step / length)[:, None]
+            yield iteration, pos.tolist()
+    
+    def _grid_repulsion_numpy(self, pos):
+        """Répulsion approchée: exacte dans les cellules voisines, par centroïdes au-delà"""
+        n = len(pos)
+        k2 = self.k * self.k
+        # Cellules d'au moins 2k, assez grandes pour contenir ~4 nœuds en moyenne
+        extent = float((pos.max(axis=0) - pos.min(axis=0)).max())
+        cell_size = max(2 * self.k, extent / math.sqrt(n / 4))
+        cells = np.floor(pos / cell_size).astype(np.int64)
+        cx = cells[:, 0] - cells[:, 0].min() + 1
+        cy = cells[:, 1] - cells[:, 1].min() + 1
+        width = int(cy.max()) + 2
+        keys = cx * width + cy
+        
+        # Champ proche: toutes les paires dont les cellules sont voisines
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        pairs_i, pairs_j = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                target = keys + dx * width + dy
+                lo = np.searchsorted(sorted_keys, target, side="left")
+                hi = np.searchsorted(sorted_keys, target, side="right")
+                counts = hi - lo
+                total = int(counts.sum())
+                if not total:
+                    continue
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                pairs_i.append(np.repeat(np.arange(n), counts))
+                pairs_j.append(order[np.repeat(lo, counts) + offsets])
+        
+        disp = np.zeros_like(pos)
+        i = np.concatenate(pairs_i)
+        j = np.concatenate(pairs_j)
+        keep = i != j
+        i, j = i[keep], j[keep]
+        delta = pos[i] - pos[j]
+        factor = k2 / np.maximum((delta ** 2).sum(axis=1), 0.01)
+        for axis in (0, 1):
+            disp[:, axis] += np.bincount(i, weights=delta[:, axis] * factor, minlength=n)
+        
+        # Champ lointain: chaque cellule non voisine agit comme sa masse au centroïde
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        mass = np.bincount(inverse).astype(float)
+        centroids = np.stack([np.bincount(inverse, weights=pos[:, 0]),
+                              np.bincount(inverse, weights=pos[:, 1])], axis=1) / mass[:, None]
+        ucx, ucy = unique_keys // width, unique_keys % width
+        for start in range(0, n, 1000):
+            rows = slice(start, start + 1000)
+            near = ((np.abs(cx[rows, None] - ucx[None, :]) <= 1) &
+                    (np.abs(cy[rows, None] - ucy[None, :]) <= 1))
+            disp[rows] += self._repulsion_numpy(pos[rows], centroids, mass, near)
+        return disp
+    
+    def _repulsion_numpy(self, points, sources, mass, exclude=None):
+        """Somme des répulsions k²/d exercées par des sources pondérées sur des points"""
+        dx = points[:, 0, None] - sources[None, :, 0]
+        dy = points[:, 1, None] - sources[None, :, 1]
+        factor = (self.k * self.k) * mass[None, :] / np.maximum(dx * dx + dy * dy, 0.01)
+        if exclude is not None:
+            factor[exclude] = 0.0
+        # Somme de (p - s) * f = p * somme(f) - f @ s, sans tableau 3D intermédiaire
+        total = factor.sum(axis=1)
+        return np.stack([points[:, 0] * total - factor @ sources[:, 0],
+                         points[:, 1] * total - factor @ sources[:, 1]], axis=1)
+    
+    def _iterate_python(self, start, side):
+        """Repli sans NumPy: répulsion exacte ou limitée aux cellules voisines"""
+        pos = [list(p) for p in start]
+        n = len(pos)
+        k2 = self.k * self.k
+        cell_size = 2 * self.k
+        
+        for iteration in range(self.iterations):
+            disp = [[0.0, 0.0] for _ in range(n)]
+            
+            if n <= self.EXACT_LIMIT // 2:
+                def neighbours(i):
+                    return range(n)
+            else:
+                grid = {}
+                for i, (x, y) in enumerate(pos):
+                    grid.setdefault((int(x // cell_size), int(y // cell_size)), []).append(i)
+                
+                def neighbours(i):
+                    gx, gy = int(pos[i][0] // cell_size), int(pos[i][1] // cell_size)
+                    for dx in (-1, 0, 1):
+                        for dy in (-1, 0, 1):
+                            yield from grid.get((gx + dx, gy + dy), ())
+            
+            for i in range(n):
+                xi, yi = pos[i]
+                for j in neighbours(i):
+                    if i == j:
+                        continue
+                    dx, dy = xi - pos[j][0], yi - pos[j][1]
+                    factor = k2 / max(dx * dx + dy * dy, 0.01)
+                    disp[i][0] += dx * factor
+                    disp[i][1] += dy * factor
+            
+            for s, d in self.edges:
+                dx, dy = pos[s][0] - pos[d][0], pos[s][1] - pos[d][1]
+                factor = max(math.hypot(dx, dy), 0.01) / self.k
+                disp[s][0] -= dx * factor
+                disp[s][1] -= dy * factor
+                disp[d][0] += dx * factor
+                disp[d][1] += dy * factor
+            
+            mean_x = sum(p[0] for p in pos) / n
+            mean_y = sum(p[1] for p in pos) / n
+            temperature = self._temperature(iteration, side)
+            for i in range(n):
+                dx = disp[i][0] - self.GRAVITY * (pos[i][0] - mean_x)
+                dy = disp[i][1] - self.GRAVITY * (pos[i][1] - mean_y)
+                length = max(math.hypot(dx, dy), 0.01)
+                step = min(length, temperature)
+                pos[i][0] += dx / length * step
+                pos[i][1] += dy / length * step
+            yield iteration, pos
+
+class LayeredLayout:
+    """Disposition hiérarchique en couches (style Sugiyama)
+    
+    1. Rangs: parcours en largeur depuis les routeurs et pare-feux (cœur),
+       composante par composante.
+    2. Ordre dans chaque couche: balayages barycentriques descendants puis
+       montants pour réduire les croisements.
+    3. Coordonnées: chaque nœud vise le barycentre de ses voisins de la
+       couche supérieure, avec un espacement minimal.
+    Chaque étape est linéaire en nœuds + connexions (au tri des couches près).
+    """
+    
+    CORE_CATEGORIES = ("Routeur", "Sécurité")
+    
+    def __init__(self, nodes, edges, x_spacing=160, y_spacing=150, sweeps=8):
+        self.nodes = nodes  # nom -> catégorie
+        self.adjacency = {name: [] for name in nodes}
+        for s, d in edges:
+            if s in self.adjacency and d in self.adjacency and s != d:
+                self.adjacency[s].append(d)
+                self.adjacency[d].append(s)
+        self.x_spacing = x_spacing
+        self.y_spacing = y_spacing
+        self.sweeps = sweeps
+    
+    def run(self):
+        """Retourne {nom: (x, y)}, les composantes côte à côte"""
+        positions = {}
+        offset_x = 100
+        for layers in self._components_layers():
+            self._reduce_crossings(layers)
+            coords = self._assign_coordinates(layers)
+            min_x = min(coords.values())
+            max_x = max(coords.values())
+            for rank, layer in enumerate(layers):
+                for node in layer:
+                    positions[node] = (coords[node] - min_x + offset_x, 100 + rank * self.y_spacing)
+            offset_x += max_x - min_x + 2 * self.x_spacing
+        return positions
+    
+    def _components_layers(self):
+        """Rangs par parcours en largeur multi-sources, par composante connexe"""
+        rank = {}
+        components = []
+        position = {name: i for i, name in enumerate(self.nodes)}
+        core = [n for n, category in self.nodes.items()
+                if category in self.CORE_CATEGORIES]
+        core_set = set(core)
+        # Les composantes sans équipement de cœur partent du nœud de plus haut degré
+        others = sorted(self.nodes, key=lambda n: -len(self.adjacency[n]))
+        
+        for seed in core + others:
+            if seed in rank:
+                continue
+            # Tous les équipements de cœur de la composante sont au rang 0
+            component = self._component_of(seed)
+            sources = sorted((n for n in component if n in core_set), key=position.get) or [seed]
+            layers = [list(sources)]
+            for node in sources:
+                rank[node] = 0
+            frontier = sources
+            while frontier:
+                next_layer = []
+                for node in frontier:
+                    for neighbour in self.adjacency[node]:
+                        if neighbour not in rank:
+                            rank[neighbour] = len(layers)
+                            next_layer.append(neighbour)
+                if next_layer:
+                    layers.append(next_layer)
+                frontier = next_layer
+            components.append(layers)
+        return components
+    
+    def _component_of(self, seed):
+        seen = {seed}
+        stack = [seed]
+        while stack:
+            node = stack.pop()
+            for neighbour in self.adjacency[node]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        return seen
+    
+    def _reduce_crossings(self, layers):
+        """Balayages barycentriques alternés (descendant puis montant)"""
+        order = {node: i for layer in layers for i, node in enumerate(layer)}
+        for sweep in range(self.sweeps):
+            # Descendant: couche de référence au-dessus; montant: au-dessous
+            if sweep % 2 == 0:
+                indices, step = range(1, len(layers)), -1
+            else:
+                indices, step = range(len(layers) - 2, -1, -1), 1
+            
+            for r in indices:
+                ref_layer = set(layers[r + step])
+                layers[r].sort(key=lambda node: self._barycenter(node, ref_layer, order))
+                for i, node in enumerate(layers[r]):
+                    order[node] = i
+    
+    def _barycenter(self, node, ref_layer, order):
+        """Position moyenne des voisins d'un nœud dans la couche de référence"""
+        linked = [order[n] for n in self.adjacency[node] if n in ref_layer]
+        return sum(linked) / len(linked) if linked else order[node]
+    
+    def _assign_coordinates(self, layers):
+        """Abscisses: barycentre des voisins de la couche supérieure, espacement minimal"""
+        x = {}
+        for i, node in enumerate(layers[0]):
+            x[node] = i * self.x_spacing
+        
+        for r in range(1, len(layers)):
+            upper = set(layers[r - 1])
+            previous = None
+            for node in layers[r]:
+                linked = [x[n] for n in self.adjacency[node] if n in upper]
+                desired = sum(linked) / len(linked) if linked else (previous or 0) + self.x_spacing
+                if previous is not None:
+                    desired = max(desired, previous + self.x_spacing)
+                x[node] = desired
+                previous = desired
+        return x
+
+class TopologyScene:
+    """Modèle de scène (mode retenu) du canvas de visualisation
+    
+    Associe chaque nœud et chaque connexion aux éléments du canvas qui les
+    représentent. sync() compare l'état voulu à l'état dessiné et ne crée,
+    déplace ou supprime que les éléments concernés.
+    
+    Les positions sont exprimées en coordonnées monde; le zoom est une
+    transformation de vue (canvas = monde * scale + offset) appliquée par
+    canvas.scale(), sans recalcul de la scène.
+    
+    Seuls les nœuds proches de la zone visible (index spatial par cellules)
+    et leurs connexions sont dessinés, avec un niveau de détail qui dépend
+    du zoom: étiquettes de ports et types masqués, puis simples points.
+    """
+    
+    CATEGORY_COLORS = {
+        "Routeur": "#FF6B6B",      # Rouge
+        "Switch": "#4ECDC4",       # Turquoise
+        "Sécurité": "#FFD166",     # Jaune
+        "Serveur": "#06D6A0",      # Vert
+        "Client": "#118AB2",       # Bleu
+        "Test": "#EF476F",         # Rose
+        "Connectivité": "#073B4C", # Noir bleuté
+        "Autre": "#999999"         # Gris
+    }
+    
+    DETAIL_SCALE = 0.7  # En dessous: ni type ni étiquettes de ports
+    DOT_SCALE = 0.35    # En dessous: nœuds dessinés comme des points
+    CELL_SIZE = 400     # Taille des cellules de l'index spatial (coordonnées monde)
+    MARK_LAYERS = ("critical", "path", "selection")  # Par priorité croissante
+    
+    def __init__(self, canvas, bind_node=None):
+        self.canvas = canvas
+        self.bind_node = bind_node  # Appelé avec (élément, nom) à la création d'un nœud
+        
+        # État monde
+        self.nodes = {}             # nom -> NodeRecord
+        self.positions = {}         # nom -> (x, y)
+        self.links = {}             # (source, port_s, dest, port_d) -> LinkRecord
+        self.node_links = {}        # nom -> clés des connexions incidentes
+        self.cells = {}             # (cx, cy) -> noms des nœuds de la cellule
+        self.bounds = None          # (min_x, min_y, max_x, max_y)
+        
+        # Éléments dessinés
+        self.node_items = {}        # nom -> {"shape", "name", "type"}
+        self.link_items = {}        # clé -> {"line", "label"}
+        self.highlighted = []       # (élément, options à restaurer)
+        # Marques par couche: couche -> ({nom: couleur}, {clé: couleur})
+        self.marks = {layer: ({}, {}) for layer in self.MARK_LAYERS}
+        self.placeholder = None
+        
+        # Transformation de vue
+        self.scale = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self.lod = self.level_of_detail()
+    
+    def to_canvas(self, x, y):
+        """Convertit des coordonnées monde en coordonnées canvas"""
+        return x * self.scale + self.offset_x, y * self.scale + self.offset_y
+    
+    def to_world(self, x, y):
+        """Convertit des coordonnées canvas en coordonnées monde"""
+        return (x - self.offset_x) / self.scale, (y - self.offset_y) / self.scale
+    
+    def level_of_detail(self):
+        """Niveau de détail pour le zoom courant: "full", "compact" ou "dot\""""
+        if self.scale < self.DOT_SCALE:
+            return "dot"
+        if self.scale < self.DETAIL_SCALE:
+            return "compact"
+        return "full"
+    
+    def zoom(self, x, y, factor):
+        """Zoome la scène autour du point canvas (x, y)"""
+        self.canvas.scale("scene", x, y, factor, factor)
+        self.scale *= factor
+        self.offset_x = self.offset_x * factor + x * (1 - factor)
+        self.offset_y = self.offset_y * factor + y * (1 - factor)
+    
+    def set_view(self, scale=1.0, offset_x=0.0, offset_y=0.0):
+        """Impose une transformation de vue et replace tous les éléments"""
+        self.scale = scale
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        for name, item in self.node_items.items():
+            self._move_node(item, *self.positions[name])
+        for key in self.link_items:
+            self._move_link(key)
+        self.update_fonts()
+        self.update_view()
+    
+    def font_size(self, base):
+        """Taille de police adaptée au niveau de zoom"""
+        return max(1, round(base * self.scale))
+    
+    def update_fonts(self):
+        """Met les polices des textes de la scène à l'échelle du zoom"""
+        self.canvas.itemconfig("node_name", font=("Arial", self.font_size(10), "bold"))
+        self.canvas.itemconfig("node_type", font=("Arial", self.font_size(8)))
+        self.canvas.itemconfig("link_label", font=("Arial", self.font_size(8)))
+    
+    def scroll_region(self, padding=100):
+        """Région de défilement couvrant toute la topologie, dessinée ou non"""
+        if self.bounds is None:
+            return None
+        x1, y1 = self.to_canvas(self.bounds[0] - 60, self.bounds[1] - 30)
+        x2, y2 = self.to_canvas(self.bounds[2] + 60, self.bounds[3] + 30)
+        return (x1 - padding, y1 - padding, x2 + padding, y2 + padding)
+    
+    def sync(self, nodes, links, positions):
+        """Applique au canvas la différence entre la scène et la topologie
+        
+        nodes: nom -> NodeRecord, links: clé -> LinkRecord, positions: nom -> (x, y).
+        """
+        # Nœuds supprimés ou remplacés
+        for name in list(self.positions):
+            if nodes.get(name) is not self.nodes[name] or name not in positions:
+                self._remove_node(name)
+        
+        # Nœuds nouveaux ou déplacés
+        moved = set()
+        for name, pos in positions.items():
+            old = self.positions.get(name)
+            if old != pos:
+                if old is not None:
+                    self._unindex(name, old)
+                self.nodes[name] = nodes[name]
+                self.positions[name] = pos
+                self._index(name, pos)
+                moved.add(name)
+        
+        # Connexions
+        for key in list(self.links):
+            if key not in links or key[0] not in positions or key[2] not in positions:
+                self._remove_link(key)
+        
+        for key, link in links.items():
+            if key not in self.links and key[0] in positions and key[2] in positions:
+                self._add_link(key, link)
+        
+        # Nœuds déjà dessinés et déplacés: seules leurs connexions incidentes sont recalculées
+        to_move = set()
+        for name in moved:
+            item = self.node_items.get(name)
+            if item is not None:
+                self._move_node(item, *self.positions[name])
+                to_move.update(self.node_links.get(name, ()))
+        for key in to_move:
+            if key in self.link_items:
+                self._move_link(key)
+        
+        if moved:
+            xs = [x for x, _ in self.positions.values()]
+            ys = [y for _, y in self.positions.values()]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys)) if xs else None
+        elif not self.positions:
+            self.bounds = None
+        
+        self.update_view()
+        self._update_placeholder(bool(nodes))
+    
+    def add_link(self, link):
+        """Ajoute une connexion sans repasser sur toute la topologie"""
+        key = link.key
+        if key in self.links or key[0] not in self.positions or key[2] not in self.positions:
+            return
+        self._add_link(key, link)
+        if key[0] in self.node_items or key[2] in self.node_items:
+            self._create_link(key)
+    
+    def remove_link(self, key):
+        """Retire une connexion de la scène"""
+        if key in self.links:
+            self._remove_link(key)
+    
+    def remove_node(self, name):
+        """Retire un nœud et ses connexions de la scène"""
+        for key in list(self.node_links.get(name, ())):
+            self._remove_link(key)
+        if name in self.positions:
+            self._remove_node(name)
+        self._update_placeholder(bool(self.nodes))
+    
+    def update_view(self):
+        """Dessine ce qui entre dans la zone visible, efface ce qui en sort"""
+        lod = self.level_of_detail()
+        if lod != self.lod:
+            # Changement de niveau de détail: on redessine la zone visible
+            self.clear()
+            self.lod = lod
+        
+        visible_nodes = self.visible_nodes()
+        for name in [n for n in self.node_items if n not in visible_nodes]:
+            self._delete_node_items(name)
+        for name in visible_nodes:
+            if name not in self.node_items:
+                self._create_node(name)
+        
+        # Une connexion est dessinée dès qu'une de ses extrémités l'est
+        visible_links = set()
+        for name in visible_nodes:
+            visible_links.update(self.node_links.get(name, ()))
+        for key in [k for k in self.link_items if k not in visible_links]:
+            self._delete_link_items(key)
+        for key in visible_links:
+            if key not in self.link_items:
+                self._create_link(key)
+    
+    def visible_nodes(self):
+        """Nœuds dont la cellule touche la zone visible élargie d'une demi-vue"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            # Canvas pas encore affiché: on se fie à sa taille demandée
+            width = int(self.canvas.cget("width"))
+            height = int(self.canvas.cget("height"))
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        x1, y1 = self.to_world(left - width / 2, top - height / 2)
+        x2, y2 = self.to_world(left + width * 1.5, top + height * 1.5)
+        
+        size = self.CELL_SIZE
+        cx1, cx2 = int(x1 // size), int(x2 // size)
+        cy1, cy2 = int(y1 // size), int(y2 // size)
+        visible = set()
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            # Vue plus large que la topologie: parcourir les cellules occupées
+            for (cx, cy), names in self.cells.items():
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2:
+                    visible.update(names)
+        else:
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    visible.update(self.cells.get((cx, cy), ()))
+        return visible
+    
+    def mark(self, nodes=(), links=(), color="#FF8C00", layer="selection"):
+        """Marque durablement des nœuds et des connexions d'une couleur
+        
+        Les éléments pas encore dessinés prennent la marque à leur création.
+        Une couche de priorité plus haute (MARK_LAYERS) l'emporte.
+        """
+        node_marks, link_marks = self.marks[layer]
+        for name in nodes:
+            node_marks[name] = color
+        for key in links:
+            link_marks[key] = color
+        self._restyle(nodes, links)
+    
+    def clear_marks(self, layer="selection"):
+        """Retire les marques d'une couche"""
+        nodes, links = self.marks[layer]
+        self.marks[layer] = ({}, {})
+        self._restyle(nodes, links)
+    
+    def _restyle(self, nodes, links):
+        for name in nodes:
+            item = self.node_items.get(name)
+            if item is not None:
+                self.canvas.itemconfig(item["shape"], **self._node_style(name))
+        for key in links:
+            item = self.link_items.get(key)
+            if item is not None:
+                self.canvas.itemconfig(item["line"], **self._link_style(key))
+    
+    def _mark_color(self, index, element):
+        for layer in reversed(self.MARK_LAYERS):
+            color = self.marks[layer][index].get(element)
+            if color:
+                return color
+        return None
+    
+    def _node_style(self, name):
+        color = self._mark_color(0, name)
+        return {"outline": color, "width": 4} if color else {"outline": "#333333", "width": 2}
+    
+    def _link_style(self, key):
+        color = self._mark_color(1, key)
+        return {"fill": color, "width": 4} if color else {"fill": "#666666", "width": 2}
+    
+    def highlight(self, name):
+        """Met en surbrillance un nœud et ses connexions, en O(degré)"""
+        self.clear_highlight()
+        item = self.node_items.get(name)
+        if item is None:
+            return
+        
+        self.canvas.itemconfig(item["shape"], outline="#FF0000", width=3)
+        self.highlighted.append((item["shape"], self._node_style(name)))
+        for key in self.node_links.get(name, ()):
+            link = self.link_items.get(key)
+            if link is None:
+                continue
+            self.canvas.itemconfig(link["line"], fill="#FF0000", width=3)
+            self.highlighted.append((link["line"], self._link_style(key)))
+            if link["label"] is not None:
+                self.canvas.itemconfig(link["label"], fill="#FF0000")
+                self.highlighted.append((link["label"], {"fill": "#333333"}))
+    
+    def clear_highlight(self):
+        """Restaure les éléments mis en surbrillance"""
+        for item_id, options in self.highlighted:
+            self.canvas.itemconfig(item_id, **options)
+        self.highlighted.clear()
+    
+    def clear(self):
+        """Efface tous les éléments dessinés (l'état monde est conservé)"""
+        for key in list(self.link_items):
+            self._delete_link_items(key)
+        for name in list(self.node_items):
+            self._delete_node_items(name)
+        self.highlighted.clear()
+    
+    def _cell(self, pos):
+        return (int(pos[0] // self.CELL_SIZE), int(pos[1] // self.CELL_SIZE))
+    
+    def _index(self, name, pos):
+        self.cells.setdefault(self._cell(pos), set()).add(name)
+    
+    def _unindex(self, name, pos):
+        cell = self._cell(pos)
+        names = self.cells.get(cell)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self.cells[cell]
+    
+    def _remove_node(self, name):
+        if name in self.node_items:
+            self._delete_node_items(name)
+        self._unindex(name, self.positions.pop(name))
+        del self.nodes[name]
+    
+    def _add_link(self, key, link):
+        self.links[key] = link
+        self.node_links.setdefault(key[0], set()).add(key)
+        self.node_links.setdefault(key[2], set()).add(key)
+    
+    def _remove_link(self, key):
+        if key in self.link_items:
+            self._delete_link_items(key)
+        del self.links[key]
+        for name in (key[0], key[2]):
+            links = self.node_links.get(name)
+            if links is not None:
+                links.discard(key)
+                if not links:
+                    del self.node_links[name]
+    
+    def _create_node(self, name):
+        info = self.nodes[name]
+        color = self.CATEGORY_COLORS.get(info.category, "#999999")
+        cx, cy = self.to_canvas(*self.positions[name])
+        s = self.scale
+        item = {"shape": None, "name": None, "type": None}
+        
+        style = self._node_style(name)
+        if self.lod == "dot":
+            item["shape"] = self.canvas.create_oval(cx-30*s, cy-30*s, cx+30*s, cy+30*s,
+                                                    fill=color, tags=("scene", "node"), **style)
+        else:
+            item["shape"] = self.canvas.create_rectangle(cx-60*s, cy-30*s, cx+60*s, cy+30*s,
+                                                         fill=color, tags=("scene", "node"), **style)
+            item["name"] = self.canvas.create_text(cx, cy-10*s, text=name,
+                                                   font=("Arial", self.font_size(10), "bold"), fill="#000000",
+                                                   tags=("scene", "node_text", "node_name"))
+        if self.lod == "full":
+            item["type"] = self.canvas.create_text(cx, cy+10*s, text=info.type,
+                                                   font=("Arial", self.font_size(8)), fill="#333333",
+                                                   tags=("scene", "node_text", "node_type"))
+        
+        self.node_items[name] = item
+        if self.bind_node:
+            self.bind_node(item["shape"], name)
+    
+    def _move_node(self, item, x, y):
+        cx, cy = self.to_canvas(x, y)
+        s = self.scale
+        if self.lod == "dot":
+            self.canvas.coords(item["shape"], cx-30*s, cy-30*s, cx+30*s, cy+30*s)
+        else:
+            self.canvas.coords(item["shape"], cx-60*s, cy-30*s, cx+60*s, cy+30*s)
+        if item["name"] is not None:
+            self.canvas.coords(item["name"], cx, cy-10*s)
+        if item["type"] is not None:
+            self.canvas.coords(item["type"], cx, cy+10*s)
+    
+    def _delete_node_items(self, name):
+        item = self.node_items.pop(name)
+        self.canvas.delete(*[i for i in item.values() if i is not None])
+    
+    def _create_link(self, key):
+        x1, y1 = self.to_canvas(*self.positions[key[0]])
+        x2, y2 = self.to_canvas(*self.positions[key[2]])
+        line = self.canvas.create_line(x1, y1, x2, y2,
+                                       arrow=tk.LAST if self.lod != "dot" else None,
+                                       tags=("scene", "link"), **self._link_style(key))
+        label = None
+        if self.lod == "full":
+            label = self.canvas.create_text((x1 + x2) / 2, (y1 + y2) / 2,
+                                            text=f"{key[1]}→{key[3]}",
+                                            fill="#333333", font=("Arial", self.font_size(8)),
+                                            tags=("scene", "link_label"))
+            self.canvas.tag_lower(label)
+        # Les connexions restent sous les nœuds
+        self.canvas.tag_lower(line)
+        self.link_items[key] = {"line": line, "label": label}
+    
+    def _move_link(self, key):
+        item = self.link_items[key]
+        x1, y1 = self.to_canvas(*self.positions[key[0]])
+        x2, y2 = self.to_canvas(*self.positions[key[2]])
+        self.canvas.coords(item["line"], x1, y1, x2, y2)
+        if item["label"] is not None:
+            self.canvas.coords(item["label"], (x1 + x2) / 2, (y1 + y2) / 2)
+    
+    def _delete_link_items(self, key):
+        item = self.link_items.pop(key)
+        self.canvas.delete(*[i for i in item.values() if i is not None])
+    
+    def _update_placeholder(self, has_nodes):
+        if has_nodes and self.placeholder is not None:
+            self.canvas.delete(self.placeholder)
+            self.placeholder = None
+        elif not has_nodes and self.placeholder is None:
+            self.placeholder = self.canvas.create_text(400, 300, text="Aucun équipement dans la topologie",
+                                                       font=("Arial", 14), fill="gray")
+
 class CMLAutomationApp:
     def __init__(self, root):
         self.root = root
@@ -17,8 +2096,10 @@ class CMLAutomationApp:
         # Variables pour stocker les données
         self.cml_client = None
         self.lab = None
-        self.nodes = {}
-        self.connections = []
+        self.topology = TopologyModel()
+        self.paths = PathEngine(self.topology)
+        self.link_rows = {}  # Clé de connexion -> ligne de l'arbre des connexions
+        self.row_links = {}  # Ligne de l'arbre -> clé de connexion
         self.topology_elements = {}  # Pour stocker les éléments graphiques
         
         # Configuration CML2 par défaut
@@ -26,9 +2107,20 @@ class CMLAutomationApp:
             "controller": "10.10.20.161",
             "username": "developer",
             "password": "C1sco12345",
-            "lab_name": "CML Automation Lab"
+            "lab_name": "CML Automation Lab",
+            "max_workers": 8,
+            "boot_timeout": 600,
+            "console_idle_ttl": 300,
+            "log_max_lines": 2000,
+            "bulk_import": True
         }
         
+        # File d'événements UI pour les threads de travail
+        self.ui = UIDispatcher(self.root)
+        
+        # Pool de sessions console réutilisables
+        self.console_pool = ConsoleSessionPool(self.cml_config["console_idle_ttl"])
+        
         # Types d'équipements disponibles (complet)
         self.device_types = [
             "external_connector",
@@ -49,6 +2141,27 @@ class CMLAutomationApp:
             "server"
         ]
         
+        # Types Linux: syntaxe de ping différente de IOS
+        self.linux_types = [
+            "alpine",
+            "desktop",
+            "server",
+            "trex",
+            "ubuntu",
+            "wan_emulator"
+        ]
+        
+        # Types dont la console présente un prompt Cisco (>, #) une fois démarrés
+        self.console_prompt_types = [
+            "asav",
+            "cat8000v",
+            "csr1000v",
+            "iol-xe",
+            "ioll2-xe",
+            "iosvl2",
+            "iosv"
+        ]
+        
         # Descriptions détaillées des équipements
         self.device_descriptions = {
             "external_connector": "Connecteur externe pour connexion à des réseaux externes\nFonction: Interface de sortie\nImage: N/A",
@@ -102,7 +2215,10 @@ class CMLAutomationApp:
         ]
         
         self.setup_gui()
+        self.topology.subscribe(self.on_topology_changed)
         self.load_config()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.ui.start()
     
     def setup_gui(self):
         # Création des onglets
@@ -137,6 +2253,11 @@ class CMLAutomationApp:
         # Barre de statut
         self.status_bar = tk.Label(self.root, text="Prêt", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        failed = [log for log in (self.output_log, self.test_log) if log.error is not None]
+        if failed:
+            self.update_status(f"Journaux conservés en mémoire seulement, dossier {LOG_DIR} "
+                               f"inaccessible: {failed[0].error.strerror or failed[0].error}")
     
     def setup_topology_tab(self):
         # PanedWindow pour diviser la fenêtre
@@ -253,7 +2374,7 @@ class CMLAutomationApp:
         tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
         self.connections_tree = ttk.Treeview(list_frame, 
-                                            columns=("Source", "PortS", "Dest", "PortD"), 
+                                            columns=("Source", "PortS", "Dest", "PortD", "Cost"), 
                                             height=8, show="headings",
                                             yscrollcommand=tree_scroll.set)
         self.connections_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -263,11 +2384,16 @@ class CMLAutomationApp:
         self.connections_tree.heading("PortS", text="Port Source")
         self.connections_tree.heading("Dest", text="Destination")
         self.connections_tree.heading("PortD", text="Port Dest")
+        self.connections_tree.heading("Cost", text="Coût")
         
         self.connections_tree.column("Source", width=120)
         self.connections_tree.column("PortS", width=80)
         self.connections_tree.column("Dest", width=120)
         self.connections_tree.column("PortD", width=80)
+        self.connections_tree.column("Cost", width=50)
+        
+        # Double-clic: modifier le coût utilisé pour les calculs de chemin
+        self.connections_tree.bind("<Double-1>", self.edit_connection_cost)
         
         # Boutons pour les connexions
         conn_btn_frame = ttk.Frame(frame_connections)
@@ -277,6 +2403,10 @@ class CMLAutomationApp:
                   command=self.delete_connection).pack(side=tk.LEFT, padx=2)
         ttk.Button(conn_btn_frame, text="Vérifier connectivité",
                   command=self.check_connectivity).pack(side=tk.LEFT, padx=2)
+        ttk.Button(conn_btn_frame, text="Points de défaillance",
+                  command=self.show_failure_impact).pack(side=tk.LEFT, padx=2)
+        ttk.Button(conn_btn_frame, text="Chemin...",
+                  command=self.show_path_window).pack(side=tk.LEFT, padx=2)
         
         # Frame pour les actions du labo
         frame_actions = ttk.LabelFrame(right_frame, text="Actions du Labo", padding=10)
@@ -291,12 +2421,18 @@ class CMLAutomationApp:
                   command=self.show_visualization).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_action_frame, text="Arrêter le labo",
                   command=self.stop_lab).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_action_frame, text="Purger les labs...",
+                  command=self.show_purge_window).pack(side=tk.LEFT, padx=2)
         
         btn_action_frame2 = ttk.Frame(frame_actions)
         btn_action_frame2.pack(pady=5)
         
+        ttk.Button(btn_action_frame2, text="Mettre à jour le labo",
+                  command=self.update_existing_lab).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_action_frame2, text="Supprimer le labo",
                   command=self.delete_lab).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_action_frame2, text="Vérifier disponibilité",
+                  command=self.check_lab_readiness).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_action_frame2, text="Exporter topologie",
                   command=self.export_topology).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_action_frame2, text="Importer topologie",
@@ -323,6 +2459,8 @@ class CMLAutomationApp:
                   command=lambda: self.draw_topology("grid")).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Disposition Hiérarchique", 
                   command=lambda: self.draw_topology("hierarchical")).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Disposition Forces", 
+                  command=lambda: self.draw_topology("force")).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Zoom +", 
                   command=self.zoom_in).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Zoom -", 
@@ -330,6 +2468,11 @@ class CMLAutomationApp:
         ttk.Button(btn_frame, text="Réinitialiser vue", 
                   command=self.reset_view).pack(side=tk.LEFT, padx=5)
         
+        # Ombrage des éléments critiques, recalculé à chaque modification
+        self.show_critical_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(btn_frame, text="Éléments critiques", variable=self.show_critical_var,
+                       command=self.update_critical_marks).pack(side=tk.LEFT, padx=5)
+        
         # Canvas pour la visualisation avec scrollbars
         canvas_frame = ttk.Frame(main_frame)
         canvas_frame.pack(fill=tk.BOTH, expand=True)
@@ -349,16 +2492,23 @@ class CMLAutomationApp:
                                scrollregion=(0, 0, 2000, 2000))
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        h_scrollbar.config(command=self.canvas.xview)
-        v_scrollbar.config(command=self.canvas.yview)
+        h_scrollbar.config(command=self.scroll_canvas_x)
+        v_scrollbar.config(command=self.scroll_canvas_y)
+        
+        # Zoom et défilement: transformation de vue, détails et éléments
+        # visibles mis à jour quand la molette ou le glissement s'arrête
+        self.view_job = None
         
-        # Variables pour le zoom
-        self.zoom_level = 1.0
-        self.canvas_objects = []
+        # Scène retenue: seules les différences sont appliquées au canvas
+        self.scene = TopologyScene(self.canvas, bind_node=self.bind_node_events)
+        self.current_layout = "circular"
+        self.layout_positions = {}  # Positions avant zoom, par nœud
+        self.layout_generation = 0  # Invalide les calculs de disposition en cours
         
         # Bind des événements de souris
         self.canvas.bind("<ButtonPress-1>", self.start_drag)
         self.canvas.bind("<B1-Motion>", self.drag)
+        self.canvas.bind("<Configure>", lambda e: self.schedule_view_update())
         self.canvas.bind("<MouseWheel>", self.mouse_wheel)  # Windows
         self.canvas.bind("<Button-4>", self.mouse_wheel)    # Linux
         self.canvas.bind("<Button-5>", self.mouse_wheel)    # Linux
@@ -487,6 +2637,8 @@ class CMLAutomationApp:
         
         ttk.Button(output_toolbar, text="Appliquer configuration",
                   command=self.apply_configuration).pack(side=tk.LEFT, padx=2)
+        ttk.Button(output_toolbar, text="Appliquer à plusieurs...",
+                  command=self.show_multi_apply_window).pack(side=tk.LEFT, padx=2)
         ttk.Button(output_toolbar, text="Tester configuration",
                   command=self.test_configuration).pack(side=tk.LEFT, padx=2)
         ttk.Button(output_toolbar, text="Effacer sortie",
@@ -494,10 +2646,18 @@ class CMLAutomationApp:
         ttk.Button(output_toolbar, text="Exporter logs",
                   command=self.export_logs).pack(side=tk.LEFT, padx=2)
         
+        self.bulk_push_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(output_toolbar, text="Envoi par blocs",
+                       variable=self.bulk_push_var).pack(side=tk.LEFT, padx=10)
+        
         # Output text area
         self.output_text = scrolledtext.ScrolledText(frame_output, wrap=tk.WORD, 
                                                     height=10, font=("Courier", 9))
         self.output_text.pack(fill=tk.BOTH, expand=True)
+        
+        # Seules les dernières lignes restent à l'écran, le reste est dans le journal
+        self.output_log = LogBuffer(self.output_text, os.path.join(LOG_DIR, "configuration.log"),
+                                    self.cml_config["log_max_lines"])
     
     def setup_test_tab(self):
         """Configure l'onglet Test"""
@@ -549,6 +2709,10 @@ class CMLAutomationApp:
                   command=self.run_standard_test).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Exécuter commande personnalisée",
                   command=self.run_custom_test).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Matrice de tests...",
+                  command=self.show_test_matrix_window).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Matrice de joignabilité...",
+                  command=self.show_reachability_window).pack(side=tk.LEFT, padx=5)
         
         # Zone de résultats
         frame_results = ttk.LabelFrame(main_frame, text="Résultats", padding=10)
@@ -556,6 +2720,8 @@ class CMLAutomationApp:
         
         self.test_output = scrolledtext.ScrolledText(frame_results, wrap=tk.WORD, height=15)
         self.test_output.pack(fill=tk.BOTH, expand=True)
+        self.test_log = LogBuffer(self.test_output, os.path.join(LOG_DIR, "tests.log"),
+                                  self.cml_config["log_max_lines"])
         
         # Boutons pour les résultats
         result_btn_frame = ttk.Frame(frame_results)
@@ -613,6 +2779,32 @@ class CMLAutomationApp:
         self.lab_name_entry.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
         self.lab_name_entry.insert(0, self.cml_config["lab_name"])
         
+        ttk.Label(frame_lab, text="Parallélisme max:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.max_workers_entry = ttk.Entry(frame_lab, width=8)
+        self.max_workers_entry.grid(row=1, column=1, sticky=tk.W, padx=5, pady=5)
+        self.max_workers_entry.insert(0, str(self.cml_config["max_workers"]))
+        
+        ttk.Label(frame_lab, text="Délai démarrage (s):").grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.boot_timeout_entry = ttk.Entry(frame_lab, width=8)
+        self.boot_timeout_entry.grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
+        self.boot_timeout_entry.insert(0, str(self.cml_config["boot_timeout"]))
+        
+        ttk.Label(frame_lab, text="Expiration sessions console (s):").grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.console_ttl_entry = ttk.Entry(frame_lab, width=8)
+        self.console_ttl_entry.grid(row=3, column=1, sticky=tk.W, padx=5, pady=5)
+        self.console_ttl_entry.insert(0, str(self.cml_config["console_idle_ttl"]))
+        
+        ttk.Label(frame_lab, text="Lignes affichées (sorties):").grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.log_lines_entry = ttk.Entry(frame_lab, width=8)
+        self.log_lines_entry.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
+        self.log_lines_entry.insert(0, str(self.cml_config["log_max_lines"]))
+        
+        # Import de topologie: tout le lab en une requête au lieu d'une par objet
+        self.bulk_import_var = tk.BooleanVar(value=self.cml_config["bulk_import"])
+        ttk.Checkbutton(frame_lab, text="Déploiement par import de topologie (une requête)",
+                        variable=self.bulk_import_var).grid(row=5, column=0, columnspan=2,
+                                                            sticky=tk.W, pady=5)
+        
         # Frame pour les actions
         frame_actions = ttk.LabelFrame(main_frame, text="Actions", padding=10)
         frame_actions.pack(fill=tk.X, pady=(0, 10))
@@ -733,27 +2925,14 @@ class CMLAutomationApp:
             # Générer un nom unique si nécessaire
             base_name = device_name
             counter = 1
-            while device_name in self.nodes:
+            while device_name in self.topology.nodes:
                 device_name = f"{base_name}_{counter}"
                 counter += 1
             
-            # Ajouter aux combobox
-            current_values = list(self.source_device_combo['values'])
-            if device_name not in current_values:
-                self.source_device_combo['values'] = current_values + [device_name]
-                self.dest_device_combo['values'] = current_values + [device_name]
-                self.config_device_combo['values'] = current_values + [device_name]
-                self.test_device_combo['values'] = current_values + [device_name]
-            
-            # Stocker l'équipement
-            self.nodes[device_name] = {
-                "type": device_type,
-                "category": item["values"][2],
-                "interfaces": {}
-            }
+            # Stocker l'équipement (les vues suivent via on_topology_changed)
+            self.topology.add_node(device_name, device_type, item["values"][2])
         
         self.update_status(f"{len(selected)} équipement(s) ajouté(s)")
-        self.refresh_visualization()
     
     def add_custom_device(self):
         """Ajoute un équipement personnalisé"""
@@ -764,30 +2943,18 @@ class CMLAutomationApp:
             messagebox.showerror("Erreur", "Veuillez entrer un nom pour l'équipement.")
             return
         
-        if name in self.nodes:
+        if name in self.topology.nodes:
             messagebox.showerror("Erreur", "Un équipement avec ce nom existe déjà.")
             return
         
         # Déterminer la catégorie
         category = self.get_category_from_type(dev_type)
         
-        # Ajouter aux combobox
-        current_values = list(self.source_device_combo['values'])
-        self.source_device_combo['values'] = current_values + [name]
-        self.dest_device_combo['values'] = current_values + [name]
-        self.config_device_combo['values'] = current_values + [name]
-        self.test_device_combo['values'] = current_values + [name]
-        
         # Stocker l'équipement
-        self.nodes[name] = {
-            "type": dev_type,
-            "category": category,
-            "interfaces": {}
-        }
+        self.topology.add_node(name, dev_type, category)
         
         self.update_status(f"Équipement '{name}' ajouté ({dev_type})")
         self.device_name_entry.delete(0, tk.END)
-        self.refresh_visualization()
     
     def get_category_from_type(self, device_type):
         """Retourne la catégorie basée sur le type d'équipement"""
@@ -834,27 +3001,24 @@ class CMLAutomationApp:
             return
         
         # Vérifier si la connexion existe déjà
-        for conn in self.connections:
-            if (conn["source"] == source and conn["dest"] == dest and 
-                conn["port_s"] == port_s and conn["port_d"] == port_d):
-                messagebox.showwarning("Connexion existante", "Cette connexion existe déjà.")
-                return
+        if self.topology.has_link((source, port_s, dest, port_d)):
+            messagebox.showwarning("Connexion existante", "Cette connexion existe déjà.")
+            return
         
-        # Ajouter la connexion
-        connection = {
-            "source": source,
-            "port_s": port_s,
-            "dest": dest,
-            "port_d": port_d
-        }
-        self.connections.append(connection)
+        # Un port ne peut porter qu'une connexion
+        for device, port in ((source, port_s), (dest, port_d)):
+            if self.topology.port_in_use(device, port):
+                messagebox.showerror("Erreur", f"Le port {port} de {device} est déjà utilisé.")
+                return
         
-        # Mettre à jour l'arbre
-        self.connections_tree.insert("", tk.END, 
-                                   values=(source, port_s, dest, port_d))
+        # Ajouter la connexion (l'arbre et le canvas suivent via on_topology_changed)
+        try:
+            self.topology.add_link(source, port_s, dest, port_d)
+        except ValueError as e:
+            messagebox.showerror("Erreur", str(e))
+            return
         
         self.update_status(f"Connexion ajoutée: {source}:{port_s} -> {dest}:{port_d}")
-        self.refresh_visualization()
     
     def delete_connection(self):
         """Supprime la connexion sélectionnée"""
@@ -864,52 +3028,305 @@ class CMLAutomationApp:
             return
         
         for item in selected:
-            values = self.connections_tree.item(item)["values"]
-            self.connections_tree.delete(item)
-            
-            # Supprimer de la liste des connexions
-            for i, conn in enumerate(self.connections):
-                if (conn["source"] == values[0] and conn["port_s"] == values[1] and
-                    conn["dest"] == values[2] and conn["port_d"] == values[3]):
-                    del self.connections[i]
-                    break
+            key = self.row_links.get(item)
+            if key is not None:
+                self.topology.remove_link(key)
         
         self.update_status("Connexion(s) supprimée(s)")
-        self.refresh_visualization()
     
     def check_connectivity(self):
         """Vérifie la connectivité de la topologie"""
-        if not self.connections:
-            messagebox.showinfo("Connectivité", "Aucune connexion définie.")
+        if not self.topology.nodes:
+            messagebox.showinfo("Connectivité", "Aucun équipement défini.")
             return
         
-        # Simple vérification de base
-        issues = []
+        analysis = self.topology.analyze()
+        findings = []
         
-        # Vérifier les équipements non connectés
-        connected_devices = set()
-        for conn in self.connections:
-            connected_devices.add(conn["source"])
-            connected_devices.add(conn["dest"])
+        # Îlots: toute composante en dehors de la principale
+        components = analysis["components"]
+        for component in components[1:]:
+            links = {key for node in component for key in self.topology.by_node.get(node, ())}
+            if len(component) == 1:
+                findings.append(("Équipement isolé", f"{component[0]} n'est connecté à aucun autre équipement",
+                                 component, links))
+            else:
+                preview = ", ".join(component[:5]) + (", ..." if len(component) > 5 else "")
+                findings.append(("Îlot", f"{len(component)} équipement(s) séparés du reste: {preview}",
+                                 component, links))
+        
+        for node, port, keys in analysis["port_conflicts"]:
+            findings.append(("Port réutilisé", f"Port {port} de {node} utilisé par {len(keys)} connexions",
+                             [node], keys))
+        
+        for key in analysis["self_loops"]:
+            findings.append(("Boucle", f"{key[0]}:{key[1]} relié à son propre port {key[3]}",
+                             [key[0]], [key]))
+        
+        for (node_a, node_b), keys in analysis["parallel_links"]:
+            findings.append(("Liens parallèles", f"{len(keys)} connexions entre {node_a} et {node_b}",
+                             [node_a, node_b], keys))
+        
+        summary = (f"{len(self.topology.nodes)} équipement(s), {len(self.topology.links)} connexion(s), "
+                   f"{len(components)} composante(s) connexe(s)")
+        if not findings:
+            summary += " - ✅ Topologie valide"
+        self.show_findings_window("Vérification Connectivité", summary, findings)
+    
+    def show_findings_window(self, title, summary, findings, color="#FF8C00"):
+        """Liste des problèmes d'une analyse; la sélection les marque sur le canvas
         
-        for device in self.nodes:
-            if device not in connected_devices:
-                issues.append(f"⚠ {device} n'est connecté à aucun autre équipement")
+        findings: [(type, description, nœuds, clés de connexions)]
+        """
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        window.geometry("700x400")
+        window.transient(self.root)
         
-        # Vérifier les connexions doubles
-        for i, conn1 in enumerate(self.connections):
-            for conn2 in self.connections[i+1:]:
-                if (conn1["source"] == conn2["source"] and 
-                    conn1["port_s"] == conn2["port_s"]):
-                    issues.append(f"⚠ Port {conn1['port_s']} de {conn1['source']} utilisé deux fois")
+        ttk.Label(window, text=summary).pack(anchor=tk.W, padx=10, pady=(10, 5))
         
-        # Afficher les résultats
-        if issues:
-            result = "Problèmes de connectivité détectés:\n\n" + "\n".join(issues)
-        else:
-            result = "✅ Topologie valide - Tous les équipements sont correctement connectés"
+        tree_frame = ttk.Frame(window)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        
+        tree_scroll = ttk.Scrollbar(tree_frame)
+        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        findings_tree = ttk.Treeview(tree_frame, columns=("Kind", "Detail"), show="headings",
+                                     yscrollcommand=tree_scroll.set)
+        findings_tree.pack(fill=tk.BOTH, expand=True)
+        tree_scroll.config(command=findings_tree.yview)
+        findings_tree.heading("Kind", text="Type")
+        findings_tree.heading("Detail", text="Détail")
+        findings_tree.column("Kind", width=150)
+        findings_tree.column("Detail", width=500)
+        
+        elements = {}
+        for kind, detail, nodes, links in findings:
+            iid = findings_tree.insert("", tk.END, values=(kind, detail))
+            elements[iid] = (nodes, links)
+        
+        def show_selection(event=None):
+            self.scene.clear_marks()
+            nodes, links = set(), set()
+            for iid in findings_tree.selection():
+                nodes.update(elements[iid][0])
+                links.update(elements[iid][1])
+            if not nodes and not links:
+                return
+            self.scene.mark(nodes, links, color)
+            self.notebook.select(self.tab_visualization)
+            if nodes:
+                self.center_on_node(min(nodes))
         
-        messagebox.showinfo("Vérification Connectivité", result)
+        def on_close():
+            self.scene.clear_marks()
+            window.destroy()
+        
+        findings_tree.bind("<<TreeviewSelect>>", show_selection)
+        window.protocol("WM_DELETE_WINDOW", on_close)
+    
+    def on_topology_changed(self, event, record):
+        """Répercute une modification du modèle de topologie sur les vues"""
+        if self.show_critical_var.get():
+            self.ui_call(self.update_critical_marks, key="critical")
+        
+        if event == "link_added":
+            iid = self.connections_tree.insert("", tk.END, values=self.connection_row(record))
+            self.link_rows[record.key] = iid
+            self.row_links[iid] = record.key
+            self.scene.add_link(record)
+        elif event == "link_removed":
+            iid = self.link_rows.pop(record.key, None)
+            if iid is not None:
+                del self.row_links[iid]
+                self.connections_tree.delete(iid)
+            self.scene.remove_link(record.key)
+        elif event == "link_changed":
+            iid = self.link_rows.get(record.key)
+            if iid is not None:
+                self.connections_tree.item(iid, values=self.connection_row(record))
+        elif event == "node_removed":
+            self.layout_positions.pop(record.name, None)
+            self.scene.remove_node(record.name)
+            self.ui_call(self.update_device_lists, key="device_lists")
+        elif event == "node_added":
+            # Les ajouts groupés ne déclenchent qu'un placement et une mise à jour des listes
+            self.ui_call(self.update_device_lists, key="device_lists")
+            self.ui_call(self.refresh_visualization, key="visualization")
+        elif event == "reset":
+            self.connections_tree.delete(*self.connections_tree.get_children())
+            self.link_rows.clear()
+            self.row_links.clear()
+            for record in self.topology.links.values():
+                iid = self.connections_tree.insert("", tk.END, values=self.connection_row(record))
+                self.link_rows[record.key] = iid
+                self.row_links[iid] = record.key
+            self.update_device_lists()
+            self.refresh_visualization()
+    
+    @staticmethod
+    def connection_row(record):
+        """Valeurs d'une ligne de l'arbre des connexions"""
+        return (record.source, record.port_s, record.dest, record.port_d,
+                "" if record.cost is None else f"{record.cost:g}")
+    
+    def edit_connection_cost(self, event):
+        """Modifie le coût de la connexion double-cliquée"""
+        key = self.row_links.get(self.connections_tree.identify_row(event.y))
+        if key is None:
+            return
+        
+        record = self.topology.links[key]
+        answer = simpledialog.askstring("Coût de la connexion",
+                                        f"{record.source}:{record.port_s} -> {record.dest}:{record.port_d}\n"
+                                        "Coût (vide = 1):",
+                                        initialvalue="" if record.cost is None else f"{record.cost:g}",
+                                        parent=self.root)
+        if answer is None:
+            return
+        
+        if not answer.strip():
+            self.topology.set_link_cost(key, None)
+            return
+        try:
+            cost = float(answer.replace(",", "."))
+        except ValueError:
+            cost = None
+        if cost is None or not math.isfinite(cost) or cost < 0:
+            messagebox.showerror("Erreur", "Le coût doit être un nombre positif.")
+            return
+        self.topology.set_link_cost(key, cost)
+    
+    def show_path_window(self):
+        """Calcul interactif du plus court chemin entre deux équipements"""
+        if len(self.topology.nodes) < 2:
+            messagebox.showinfo("Chemin", "Au moins deux équipements sont nécessaires.")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Plus court chemin")
+        window.geometry("520x260")
+        window.transient(self.root)
+        
+        form = ttk.Frame(window, padding=10)
+        form.pack(fill=tk.BOTH, expand=True)
+        
+        names = sorted(self.topology.nodes)
+        ttk.Label(form, text="Source:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        source_combo = ttk.Combobox(form, values=names, width=30)
+        source_combo.grid(row=0, column=1, sticky=tk.W, pady=2)
+        ttk.Label(form, text="Destination:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        dest_combo = ttk.Combobox(form, values=names, width=30)
+        dest_combo.grid(row=1, column=1, sticky=tk.W, pady=2)
+        
+        weighted_var = tk.BooleanVar(value=False)
+        mode_frame = ttk.Frame(form)
+        mode_frame.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=2)
+        ttk.Radiobutton(mode_frame, text="Nombre de sauts", variable=weighted_var,
+                        value=False).pack(side=tk.LEFT)
+        ttk.Radiobutton(mode_frame, text="Coûts des liens", variable=weighted_var,
+                        value=True).pack(side=tk.LEFT, padx=10)
+        
+        # Analyse « et si »: chemin de secours sans un lien du chemin courant
+        ttk.Label(form, text="Lien coupé:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        cut_combo = ttk.Combobox(form, state="readonly", width=45)
+        cut_combo.grid(row=3, column=1, sticky=tk.W, pady=2)
+        
+        result_label = ttk.Label(form, text="", wraplength=480, justify=tk.LEFT)
+        result_label.grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        
+        path_keys = []
+        
+        def describe(key):
+            source, port_s, dest, port_d = key
+            return f"{source}:{port_s} - {dest}:{port_d}"
+        
+        def query(excluded=()):
+            self.scene.clear_marks("path")
+            source, dest = source_combo.get(), dest_combo.get()
+            if source not in self.topology.nodes or dest not in self.topology.nodes:
+                result_label.config(text="Sélectionnez deux équipements existants.")
+                return None
+            
+            started = time.perf_counter()
+            result = self.paths.shortest_path(source, dest, weighted_var.get(), excluded)
+            elapsed = (time.perf_counter() - started) * 1000
+            if result is None:
+                result_label.config(text=f"❌ Aucun chemin ({elapsed:.2f} ms)")
+                self.scene.mark((), excluded, "#B00020", layer="path")
+                return None
+            
+            nodes, keys, cost = result
+            metric = f"coût {cost:g}" if weighted_var.get() else f"{len(keys)} saut(s)"
+            result_label.config(text=f"{' → '.join(nodes)}\n{metric} - {elapsed:.2f} ms")
+            self.scene.mark(nodes, keys, "#8E24AA" if excluded else "#1E88E5", layer="path")
+            self.scene.mark((), excluded, "#B00020", layer="path")
+            self.notebook.select(self.tab_visualization)
+            self.center_on_node(source)
+            return keys
+        
+        def compute():
+            keys = query()
+            path_keys[:] = keys or []
+            cut_combo["values"] = [describe(key) for key in path_keys]
+            cut_combo.set("")
+        
+        def compute_without_link():
+            index = cut_combo.current()
+            if index < 0:
+                messagebox.showwarning("Chemin", "Sélectionnez un lien du chemin.", parent=window)
+                return
+            query((path_keys[index],))
+        
+        btn_frame = ttk.Frame(form)
+        btn_frame.grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        ttk.Button(btn_frame, text="Calculer", command=compute).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="Chemin sans ce lien",
+                   command=compute_without_link).pack(side=tk.LEFT, padx=5)
+        
+        def on_close():
+            self.scene.clear_marks("path")
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", on_close)
+    
+    def show_failure_impact(self):
+        """Liste les équipements et liens dont la panne partitionne la topologie"""
+        if not self.topology.nodes:
+            messagebox.showinfo("Points de défaillance", "Aucun équipement défini.")
+            return
+        
+        articulations, bridges = self.topology.critical_elements()
+        findings = []
+        for node, cut in sorted(articulations.items(), key=lambda item: -item[1]):
+            findings.append(("Équipement critique",
+                             f"La panne de {node} isole {cut} équipement(s)",
+                             [node], self.topology.by_node.get(node, ())))
+        for key, cut in sorted(bridges.items(), key=lambda item: -item[1]):
+            findings.append(("Lien critique",
+                             f"La coupure de {key[0]}:{key[1]} - {key[2]}:{key[3]} isole {cut} équipement(s)",
+                             [key[0], key[2]], [key]))
+        
+        summary = f"{len(articulations)} équipement(s) et {len(bridges)} lien(s) critique(s)"
+        if not findings:
+            summary += " - ✅ Aucune panne unique ne partitionne la topologie"
+        self.show_findings_window("Points de défaillance", summary, findings, color="#B00020")
+    
+    def update_critical_marks(self):
+        """Ombre les articulations et ponts sur le canvas si l'option est active"""
+        self.scene.clear_marks("critical")
+        if not self.show_critical_var.get():
+            return
+        articulations, bridges = self.topology.critical_elements()
+        self.scene.mark(articulations, bridges, "#B00020", layer="critical")
+    
+    def update_device_lists(self):
+        """Met à jour les listes d'équipements des combobox"""
+        device_names = list(self.topology.nodes.keys())
+        self.source_device_combo['values'] = device_names
+        self.dest_device_combo['values'] = device_names
+        self.config_device_combo['values'] = device_names
+        self.test_device_combo['values'] = device_names
     
     # ===== MÉTHODES POUR LA VISUALISATION =====
     
@@ -919,103 +3336,111 @@ class CMLAutomationApp:
         self.refresh_visualization()
     
     def refresh_visualization(self):
-        """Rafraîchit la visualisation"""
-        self.draw_topology("circular")
+        """Rafraîchit la visualisation en conservant la disposition choisie"""
+        # Les nœuds supprimés libèrent leur place sans déplacer les autres;
+        # le layout n'est recalculé que si des nœuds ont été ajoutés
+        nodes = self.topology.nodes
+        for node in [n for n in self.layout_positions if n not in nodes]:
+            del self.layout_positions[node]
+        if len(self.layout_positions) != len(nodes):
+            if self.current_layout == "force":
+                # Pas de nouveau calcul complet: les nœuds ajoutés rejoignent leurs voisins
+                self.place_new_nodes()
+            else:
+                self.layout_positions = self.calculate_layout(self.current_layout, list(nodes.keys()))
+        self.render_topology()
     
     def draw_topology(self, layout="circular"):
         """Dessine la topologie avec le layout spécifié"""
-        # Effacer le canvas
-        self.canvas.delete("all")
-        self.canvas_objects.clear()
+        self.current_layout = layout
+        self.layout_generation += 1
+        if layout == "force":
+            self.start_force_layout()
+            return
         
-        if not self.nodes:
-            self.canvas.create_text(400, 300, text="Aucun équipement dans la topologie",
-                                   font=("Arial", 14), fill="gray")
+        self.layout_positions = self.calculate_layout(layout, list(self.topology.nodes.keys()))
+        self.render_topology()
+    
+    def calculate_layout(self, layout, nodes):
+        """Calcule les positions des nœuds selon le layout demandé"""
+        if not nodes:
+            return {}
+        if layout == "grid":
+            return self.calculate_grid_layout(nodes)
+        if layout == "hierarchical":
+            return self.calculate_hierarchical_layout(nodes)
+        return self.calculate_circular_layout(nodes)
+    
+    def start_force_layout(self):
+        """Lance la disposition par forces en arrière-plan, avec rendu progressif"""
+        if not self.topology.nodes:
+            self.layout_positions = {}
+            self.render_topology()
             return
         
-        # Définir les couleurs par catégorie
-        category_colors = {
-            "Routeur": "#FF6B6B",      # Rouge
-            "Switch": "#4ECDC4",       # Turquoise
-            "Sécurité": "#FFD166",     # Jaune
-            "Serveur": "#06D6A0",      # Vert
-            "Client": "#118AB2",       # Bleu
-            "Test": "#EF476F",         # Rose
-            "Connectivité": "#073B4C", # Noir bleuté
-            "Autre": "#999999"         # Gris
-        }
+        generation = self.layout_generation
+        layout = ForceLayout(self.topology.nodes.keys(),
+                             [(link.source, link.dest) for link in self.topology.links.values()])
+        initial = dict(self.layout_positions)
+        node_count = len(self.topology.nodes)
         
-        # Calculer les positions selon le layout
-        positions = {}
-        node_list = list(self.nodes.keys())
-        
-        if layout == "circular":
-            positions = self.calculate_circular_layout(node_list)
-        elif layout == "grid":
-            positions = self.calculate_grid_layout(node_list)
-        elif layout == "hierarchical":
-            positions = self.calculate_hierarchical_layout(node_list)
-        
-        # Appliquer le zoom
-        for node in positions:
-            x, y = positions[node]
-            positions[node] = (x * self.zoom_level, y * self.zoom_level)
-        
-        # Dessiner les connexions d'abord (pour qu'elles soient en dessous)
-        for conn in self.connections:
-            source = conn["source"]
-            dest = conn["dest"]
-            
-            if source in positions and dest in positions:
-                x1, y1 = positions[source]
-                x2, y2 = positions[dest]
-                
-                # Dessiner la ligne
-                line = self.canvas.create_line(x1, y1, x2, y2, 
-                                              fill="#666666", width=2, arrow=tk.LAST)
-                self.canvas_objects.append(("line", line))
-                
-                # Ajouter le label des ports
-                mid_x = (x1 + x2) / 2
-                mid_y = (y1 + y2) / 2
-                
-                port_text = f"{conn['port_s']}→{conn['port_d']}"
-                text_id = self.canvas.create_text(mid_x, mid_y, text=port_text,
-                                                 fill="#333333", font=("Arial", 8))
-                self.canvas_objects.append(("text", text_id))
-        
-        # Dessiner les nœuds
-        for node_name, (x, y) in positions.items():
-            node_info = self.nodes[node_name]
-            category = node_info.get("category", "Autre")
-            color = category_colors.get(category, "#999999")
-            
-            # Dessiner le rectangle (nœud)
-            rect = self.canvas.create_rectangle(x-60, y-30, x+60, y+30,
-                                               fill=color, outline="#333333", width=2)
-            self.canvas_objects.append(("node", rect, node_name))
-            
-            # Ajouter le nom
-            name_text = self.canvas.create_text(x, y-10, text=node_name,
-                                               font=("Arial", 10, "bold"), fill="#000000")
-            self.canvas_objects.append(("text", name_text))
-            
-            # Ajouter le type
-            type_text = self.canvas.create_text(x, y+10, text=node_info["type"],
-                                               font=("Arial", 8), fill="#333333")
-            self.canvas_objects.append(("text", type_text))
-            
-            # Bind des événements pour l'interaction
-            self.canvas.tag_bind(rect, "<Enter>", 
-                                lambda e, n=node_name: self.highlight_node(n))
-            self.canvas.tag_bind(rect, "<Leave>", 
-                                lambda e: self.clear_highlight())
-            self.canvas.tag_bind(rect, "<Button-3>", 
-                                lambda e, n=node_name: self.show_node_context_menu(e, n))
+        def on_step(positions):
+            self.ui_call(self.apply_layout_positions, generation, positions, key="layout")
+        
+        def run():
+            start = time.time()
+            positions = layout.run(initial, on_step=on_step,
+                                   should_stop=lambda: generation != self.layout_generation)
+            if positions is None:
+                return
+            self.ui_call(self.apply_layout_positions, generation, positions, key="layout")
+            self.update_status(f"Disposition par forces: {node_count} nœuds en {time.time() - start:.2f} s")
+        
+        self.update_status("Calcul de la disposition par forces...")
+        threading.Thread(target=run, daemon=True).start()
+    
+    def apply_layout_positions(self, generation, positions):
+        """Applique les positions calculées en arrière-plan, si elles sont toujours d'actualité"""
+        if generation != self.layout_generation:
+            return
+        self.layout_positions.update((node, pos) for node, pos in positions.items()
+                                     if node in self.topology.nodes)
+        self.refresh_visualization()
+    
+    def place_new_nodes(self):
+        """Place les nœuds sans position près de leurs voisins déjà placés"""
+        placed = self.layout_positions
+        missing = [node for node in self.topology.nodes if node not in placed]
+        
+        max_x = max((x for x, _ in placed.values()), default=0)
+        free_slot = 0
+        for i, node in enumerate(missing):
+            anchors = [placed[n] for n in self.topology.neighbours(node) if n in placed]
+            if anchors:
+                x = sum(p[0] for p in anchors) / len(anchors)
+                y = sum(p[1] for p in anchors) / len(anchors)
+                angle = 2 * math.pi * (i % 8) / 8
+                placed[node] = (x + 150 * math.cos(angle), y + 150 * math.sin(angle))
+            else:
+                placed[node] = (max_x + 200, 100 + free_slot * 100)
+                free_slot += 1
+    
+    def render_topology(self):
+        """Synchronise la scène du canvas avec la topologie et les positions"""
+        self.scene.sync(self.topology.nodes, self.topology.links, self.layout_positions)
         
         # Mettre à jour la région de défilement
         self.update_scroll_region()
     
+    def bind_node_events(self, rect, node_name):
+        """Associe les événements d'interaction au rectangle d'un nœud"""
+        self.canvas.tag_bind(rect, "<Enter>", 
+                            lambda e, n=node_name: self.highlight_node(n))
+        self.canvas.tag_bind(rect, "<Leave>", 
+                            lambda e: self.clear_highlight())
+        self.canvas.tag_bind(rect, "<Button-3>", 
+                            lambda e, n=node_name: self.show_node_context_menu(e, n))
+    
     def calculate_circular_layout(self, nodes):
         """Calcule les positions pour un layout circulaire"""
         positions = {}
@@ -1047,57 +3472,18 @@ class CMLAutomationApp:
         return positions
     
     def calculate_hierarchical_layout(self, nodes):
-        """Calcule les positions pour un layout hiérarchique"""
-        positions = {}
-        
-        # Grouper par catégorie
-        categories = {}
-        for node in nodes:
-            category = self.nodes[node].get("category", "Autre")
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(node)
-        
-        # Positionner les catégories
-        start_x, start_y = 200, 150
-        category_spacing = 300
-        node_spacing = 120
-        
-        for i, (category, node_list) in enumerate(categories.items()):
-            cat_x = start_x + i * category_spacing
-            
-            for j, node in enumerate(node_list):
-                x = cat_x
-                y = start_y + j * node_spacing
-                positions[node] = (x, y)
-        
-        return positions
+        """Calcule les positions pour un layout hiérarchique en couches"""
+        layout = LayeredLayout({node: self.topology.nodes[node].category for node in nodes},
+                               [(link.source, link.dest) for link in self.topology.links.values()])
+        return layout.run()
     
     def highlight_node(self, node_name):
         """Met en surbrillance un nœud et ses connexions"""
-        # Trouver le rectangle du nœud
-        for obj in self.canvas_objects:
-            if obj[0] == "node" and obj[2] == node_name:
-                rect_id = obj[1]
-                self.canvas.itemconfig(rect_id, outline="#FF0000", width=3)
-                break
-        
-        # Mettre en surbrillance les connexions
-        for conn in self.connections:
-            if conn["source"] == node_name or conn["dest"] == node_name:
-                # Trouver la ligne correspondante
-                for i, obj in enumerate(self.canvas_objects):
-                    if obj[0] == "line":
-                        # On ne peut pas facilement identifier quelle ligne correspond à quelle connexion
-                        # Une approche plus sophistiquée serait nécessaire
-                        pass
+        self.scene.highlight(node_name)
     
     def clear_highlight(self):
         """Efface toutes les surbrillances"""
-        for obj in self.canvas_objects:
-            if obj[0] == "node":
-                rect_id = obj[1]
-                self.canvas.itemconfig(rect_id, outline="#333333", width=2)
+        self.scene.clear_highlight()
     
     def show_node_context_menu(self, event, node_name):
         """Affiche un menu contextuel pour un nœud"""
@@ -1126,37 +3512,17 @@ class CMLAutomationApp:
         """Supprime un nœud de la topologie"""
         if messagebox.askyesno("Confirmation", 
                               f"Supprimer l'équipement '{node_name}' et toutes ses connexions?"):
-            # Supprimer le nœud
-            del self.nodes[node_name]
-            
-            # Supprimer les connexions associées
-            self.connections = [conn for conn in self.connections 
-                              if conn["source"] != node_name and conn["dest"] != node_name]
-            
-            # Mettre à jour les combobox
-            for combo in [self.source_device_combo, self.dest_device_combo, 
-                         self.config_device_combo, self.test_device_combo]:
-                values = list(combo['values'])
-                if node_name in values:
-                    values.remove(node_name)
-                    combo['values'] = values
-            
-            # Mettre à jour l'arbre des connexions
-            self.connections_tree.delete(*self.connections_tree.get_children())
-            for conn in self.connections:
-                self.connections_tree.insert("", tk.END, 
-                                           values=(conn["source"], conn["port_s"], 
-                                                  conn["dest"], conn["port_d"]))
+            # Supprimer le nœud et ses connexions (O(degré)); les vues suivent
+            self.topology.remove_node(node_name)
             
             self.update_status(f"Équipement '{node_name}' supprimé")
-            self.refresh_visualization()
     
     def show_node_properties(self, node_name):
         """Affiche les propriétés d'un nœud"""
-        if node_name not in self.nodes:
+        if node_name not in self.topology.nodes:
             return
         
-        node_info = self.nodes[node_name]
+        node_info = self.topology.nodes[node_name]
         
         prop_window = tk.Toplevel(self.root)
         prop_window.title(f"Propriétés - {node_name}")
@@ -1173,15 +3539,17 @@ class CMLAutomationApp:
         info_frame = ttk.LabelFrame(main_frame, text="Informations", padding=10)
         info_frame.pack(fill=tk.X, pady=5)
         
-        ttk.Label(info_frame, text=f"Type: {node_info['type']}").pack(anchor=tk.W)
-        ttk.Label(info_frame, text=f"Catégorie: {node_info.get('category', 'Non définie')}").pack(anchor=tk.W)
+        ttk.Label(info_frame, text=f"Type: {node_info.type}").pack(anchor=tk.W)
+        ttk.Label(info_frame, text=f"Catégorie: {node_info.category or 'Non définie'}").pack(anchor=tk.W)
         
         # Interfaces
-        if node_info["interfaces"]:
+        if node_info.interfaces:
             intf_frame = ttk.LabelFrame(main_frame, text="Interfaces", padding=10)
             intf_frame.pack(fill=tk.BOTH, expand=True, pady=5)
             
-            for intf, status in node_info["interfaces"].items():
+            for intf, status in node_info.interfaces.items():
+                if isinstance(status, int):
+                    status = f"slot {status}"
                 ttk.Label(intf_frame, text=f"• {intf}: {status}").pack(anchor=tk.W)
         else:
             ttk.Label(main_frame, text="Aucune interface configurée").pack(pady=5)
@@ -1197,30 +3565,77 @@ class CMLAutomationApp:
     
     def zoom_in(self):
         """Zoom dans la visualisation"""
-        self.zoom_level *= 1.2
-        self.refresh_visualization()
+        self.zoom_at(*self.canvas_center(), 1.2)
     
     def zoom_out(self):
         """Zoom hors de la visualisation"""
-        self.zoom_level /= 1.2
-        if self.zoom_level < 0.5:
-            self.zoom_level = 0.5
-        self.refresh_visualization()
+        self.zoom_at(*self.canvas_center(), 1 / 1.2)
     
     def reset_view(self):
         """Réinitialise la vue"""
-        self.zoom_level = 1.0
-        self.refresh_visualization()
+        if self.view_job:
+            self.root.after_cancel(self.view_job)
+            self.view_job = None
+        self.scene.set_view()
+        self.update_scroll_region()
+    
+    def center_on_node(self, node_name):
+        """Fait défiler le canvas pour centrer un nœud"""
+        position = self.scene.positions.get(node_name)
+        region = self.scene.scroll_region()
+        if position is None or region is None:
+            return
+        
+        x, y = self.scene.to_canvas(*position)
+        width = max(region[2] - region[0], 1)
+        height = max(region[3] - region[1], 1)
+        self.canvas.xview_moveto((x - self.canvas.winfo_width() / 2 - region[0]) / width)
+        self.canvas.yview_moveto((y - self.canvas.winfo_height() / 2 - region[1]) / height)
+        self.schedule_view_update()
+    
+    def canvas_center(self):
+        """Retourne le centre de la zone visible, en coordonnées canvas"""
+        return (self.canvas.canvasx(self.canvas.winfo_width() / 2),
+                self.canvas.canvasy(self.canvas.winfo_height() / 2))
+    
+    def zoom_at(self, x, y, factor):
+        """Zoome autour du point canvas (x, y) sans redessiner la topologie"""
+        new_level = max(0.05, self.scene.scale * factor)
+        factor = new_level / self.scene.scale
+        if abs(factor - 1) < 1e-9:
+            return
+        
+        self.scene.zoom(x, y, factor)
+        self.schedule_view_update()
+    
+    def schedule_view_update(self):
+        """Regroupe les mises à jour de la vue jusqu'à l'arrêt du zoom ou du défilement"""
+        if self.view_job:
+            self.root.after_cancel(self.view_job)
+        self.view_job = self.root.after(150, self.finish_view_update)
+    
+    def finish_view_update(self):
+        """Applique les mises à jour différées: polices, niveau de détail, éléments visibles"""
+        self.view_job = None
+        self.scene.update_fonts()
+        self.scene.update_view()
+        self.update_scroll_region()
     
     def update_scroll_region(self):
         """Met à jour la région de défilement du canvas"""
-        bbox = self.canvas.bbox("all")
-        if bbox:
-            padding = 100
-            self.canvas.configure(scrollregion=(
-                bbox[0] - padding, bbox[1] - padding,
-                bbox[2] + padding, bbox[3] + padding
-            ))
+        region = self.scene.scroll_region()
+        if region:
+            self.canvas.configure(scrollregion=region)
+    
+    def scroll_canvas_x(self, *args):
+        """Défilement horizontal par la barre de défilement"""
+        self.canvas.xview(*args)
+        self.schedule_view_update()
+    
+    def scroll_canvas_y(self, *args):
+        """Défilement vertical par la barre de défilement"""
+        self.canvas.yview(*args)
+        self.schedule_view_update()
     
     def start_drag(self, event):
         """Début du glissement du canvas"""
@@ -1229,13 +3644,16 @@ class CMLAutomationApp:
     def drag(self, event):
         """Glissement du canvas"""
         self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.schedule_view_update()
     
     def mouse_wheel(self, event):
         """Gestion de la molette de la souris"""
+        x = self.canvas.canvasx(event.x)
+        y = self.canvas.canvasy(event.y)
         if event.delta > 0 or event.num == 4:
-            self.zoom_in()
+            self.zoom_at(x, y, 1.2)
         else:
-            self.zoom_out()
+            self.zoom_at(x, y, 1 / 1.2)
     
     # ===== MÉTHODES POUR LES TEMPLATES DE CONFIGURATION =====
     
@@ -1537,14 +3955,14 @@ write memory"""
             messagebox.showwarning("Aucune sélection", "Veuillez sélectionner un équipement.")
             return
         
-        if device in self.nodes:
-            node_info = self.nodes[device]
+        if device in self.topology.nodes:
+            node_info = self.topology.nodes[device]
             info_text = f"""Équipement: {device}
-Type: {node_info['type']}
-Catégorie: {node_info.get('category', 'Non définie')}
+Type: {node_info.type}
+Catégorie: {node_info.category or 'Non définie'}
 
 Description:
-{self.device_descriptions.get(node_info['type'], 'Description non disponible')}"""
+{self.device_descriptions.get(node_info.type, 'Description non disponible')}"""
             
             messagebox.showinfo(f"Informations - {device}", info_text)
         else:
@@ -1558,8 +3976,8 @@ Description:
             messagebox.showwarning("Configuration vide", "Aucune configuration à tester.")
             return
         
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.insert(tk.END, "=== TEST DE CONFIGURATION ===\n\n")
+        self.output_log.clear()
+        self.log_output("=== TEST DE CONFIGURATION ===\n\n")
         
         # Simulation simple des effets de la configuration
         lines = config_text.split('\n')
@@ -1569,26 +3987,24 @@ Description:
                 continue
             
             if "hostname" in line:
-                self.output_text.insert(tk.END, f"✓ Changement de nom d'hôte\n")
+                self.log_output(f"✓ Changement de nom d'hôte\n")
             elif "interface" in line:
-                self.output_text.insert(tk.END, f"✓ Configuration d'interface\n")
+                self.log_output(f"✓ Configuration d'interface\n")
             elif "ip address" in line:
-                self.output_text.insert(tk.END, f"✓ Attribution d'adresse IP\n")
+                self.log_output(f"✓ Attribution d'adresse IP\n")
             elif "no shutdown" in line:
-                self.output_text.insert(tk.END, f"✓ Activation d'interface\n")
+                self.log_output(f"✓ Activation d'interface\n")
             elif "router ospf" in line:
-                self.output_text.insert(tk.END, f"✓ Configuration OSPF\n")
+                self.log_output(f"✓ Configuration OSPF\n")
             elif "vlan" in line:
-                self.output_text.insert(tk.END, f"✓ Création/modification de VLAN\n")
+                self.log_output(f"✓ Création/modification de VLAN\n")
         
-        self.output_text.insert(tk.END, "\n✅ Test terminé - Configuration prête à être appliquée")
+        self.log_output("\n✅ Test terminé - Configuration prête à être appliquée")
         self.update_status("Test de configuration terminé")
     
     def export_logs(self):
         """Exporte les logs de configuration"""
-        logs = self.output_text.get(1.0, tk.END).strip()
-        
-        if not logs:
+        if self.output_log.is_empty():
             messagebox.showwarning("Logs vides", "Aucun log à exporter.")
             return
         
@@ -1599,8 +4015,7 @@ Description:
         
         if file_path:
             try:
-                with open(file_path, 'w') as f:
-                    f.write(logs)
+                self.output_log.export(file_path)
                 self.update_status(f"Logs exportés vers {file_path}")
                 messagebox.showinfo("Succès", f"Logs exportés vers {file_path}")
             except Exception as e:
@@ -1616,13 +4031,14 @@ Description:
     def apply_configuration(self):
         """Applique la configuration à l'équipement sélectionné"""
         device = self.config_device_combo.get()
-        config_text = self.config_text.get(1.0, tk.END).strip()
+        # Texte non tronqué pour conserver les numéros de ligne de l'éditeur
+        config_text = self.config_text.get(1.0, "end-1c")
         
         if not device:
             messagebox.showerror("Erreur", "Veuillez sélectionner un équipement.")
             return
         
-        if not config_text:
+        if not config_text.strip():
             messagebox.showwarning("Configuration vide", "La configuration est vide.")
             return
         
@@ -1640,59 +4056,287 @@ Description:
         """Thread pour appliquer la configuration"""
         try:
             self.update_status(f"Configuration de {device_name}...")
-            self.output_text.insert(tk.END, f"\n=== Configuration de {device_name} ===\n")
+            self.log_output(f"\n=== Configuration de {device_name} ===\n")
             
             if not self.lab:
-                self.output_text.insert(tk.END, "✗ Aucun lab actif. Veuillez d'abord créer un lab.\n")
+                self.log_output("✗ Aucun lab actif. Veuillez d'abord créer un lab.\n")
                 return
             
-            # Établir la connexion console
-            connection = self.connect_to_device_console(device_name)
-            if not connection:
-                self.output_text.insert(tk.END, f"✗ Échec de connexion à {device_name}\n")
+            def progress(sent, total):
+                self.update_status(f"Configuration de {device_name}... {sent}/{total} ligne(s)")
+            
+            try:
+                line_count, errors, elapsed = self.push_device_config(device_name, config_text, progress)
+            except ConnectionError as e:
+                self.log_output(f"✗ {str(e)}\n")
                 return
             
+            self.log_output(f"{line_count} ligne(s) envoyée(s) en {elapsed:.1f} s\n")
+            for line_no, cmd, message in errors:
+                self.log_output(f"✗ Ligne {line_no}: {cmd}\n    {message}\n")
+            
+            if errors:
+                self.log_output(f"\n⚠ Configuration de {device_name} terminée avec "
+                                f"{len(errors)} erreur(s)\n")
+                self.update_status(f"Configuration de {device_name} terminée: {len(errors)} erreur(s)")
+            else:
+                self.log_output(f"\n✓ Configuration de {device_name} terminée\n")
+                self.update_status(f"Configuration de {device_name} terminée")
+            
+        except Exception as e:
+            error_msg = f"✗ Erreur lors de la configuration: {str(e)}\n"
+            self.log_output(error_msg)
+            self.update_status(f"Erreur: {str(e)}")
+    
+    def push_device_config(self, device_name, config_text, progress=None):
+        """Applique une configuration sur un équipement via une session du pool
+        
+        Retourne (nombre de lignes, erreurs, durée). Lève ConnectionError si
+        la console de l'équipement est injoignable.
+        """
+        start = time.time()
+        
+        # Obtenir une session console (réutilisée si déjà ouverte)
+        with self.device_session(device_name) as connection:
+            if not connection:
+                raise ConnectionError(f"Échec de connexion à {device_name}")
+            
             # Diviser les commandes
-            commands = [cmd.strip() for cmd in config_text.split('\n') if cmd.strip()]
+            commands = self.parse_config_lines(config_text)
+            chunk_size = 20 if self.get_bulk_push() else 1
+            _, device_pass = self.get_device_credentials()
             
-            # Appliquer les commandes
-            for cmd in commands:
-                if cmd.startswith("!"):
-                    continue  # Ignorer les commentaires
-                
-                output = self.send_command_raw(connection, cmd)
-                self.output_text.insert(tk.END, f"\n{cmd}")
-                self.output_text.insert(tk.END, f"\n{output[:200]}...\n")  # Limiter la sortie
-                self.output_text.see(tk.END)
-                time.sleep(0.5)
+            # Appliquer les commandes par blocs
+            errors = connection.push_config(commands, chunk_size=chunk_size, progress=progress,
+                                            enable_password=device_pass)
+            connection.ensure_exec()
             
             # Sauvegarder la configuration
-            self.send_command_raw(connection, "write memory", wait_time=2)
+            self.send_command_raw(connection, "write memory", timeout=120)
+        
+        return len(commands), errors, time.time() - start
+    
+    def show_multi_apply_window(self):
+        """Fenêtre d'application d'une configuration sur plusieurs équipements"""
+        if not self.topology.nodes:
+            messagebox.showwarning("Aucun équipement", "La topologie ne contient aucun équipement.")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Application multi-équipements")
+        window.geometry("900x600")
+        window.transient(self.root)
+        
+        main_pane = ttk.PanedWindow(window, orient=tk.HORIZONTAL)
+        main_pane.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # === Sélection des équipements ===
+        left_frame = ttk.LabelFrame(main_pane, text="Équipements", padding=10)
+        main_pane.add(left_frame, weight=1)
+        
+        cat_frame = ttk.Frame(left_frame)
+        cat_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        categories = sorted({info.category for info in self.topology.nodes.values()})
+        category_combo = ttk.Combobox(cat_frame, values=["Tous"] + categories, width=15, state="readonly")
+        category_combo.pack(side=tk.LEFT, padx=2)
+        category_combo.set("Tous")
+        
+        device_list = tk.Listbox(left_frame, selectmode=tk.EXTENDED, exportselection=False)
+        device_list.pack(fill=tk.BOTH, expand=True)
+        node_names = list(self.topology.nodes.keys())
+        for name in node_names:
+            device_list.insert(tk.END, name)
+        
+        def select_category():
+            category = category_combo.get()
+            device_list.selection_clear(0, tk.END)
+            for i, name in enumerate(node_names):
+                if category == "Tous" or self.topology.nodes[name].category == category:
+                    device_list.selection_set(i)
+        
+        ttk.Button(cat_frame, text="Sélectionner catégorie",
+                  command=select_category).pack(side=tk.LEFT, padx=2)
+        
+        # === Source des configurations ===
+        right_frame = ttk.Frame(main_pane)
+        main_pane.add(right_frame, weight=2)
+        
+        source_frame = ttk.LabelFrame(right_frame, text="Configuration par équipement", padding=10)
+        source_frame.pack(fill=tk.X)
+        
+        source_var = tk.StringVar(value="editor")
+        folder_var = tk.StringVar()
+        
+        ttk.Radiobutton(source_frame, text="Texte de l'éditeur (identique pour tous)",
+                       variable=source_var, value="editor").grid(row=0, column=0, columnspan=3, sticky=tk.W)
+        ttk.Radiobutton(source_frame, text="Dossier de fichiers <équipement>.txt / .cfg",
+                       variable=source_var, value="folder").grid(row=1, column=0, sticky=tk.W)
+        ttk.Entry(source_frame, textvariable=folder_var, width=35).grid(row=1, column=1, padx=5)
+        
+        def choose_folder():
+            folder = filedialog.askdirectory(parent=window)
+            if folder:
+                folder_var.set(folder)
+                source_var.set("folder")
+        
+        ttk.Button(source_frame, text="Parcourir", command=choose_folder).grid(row=1, column=2)
+        
+        # === Progression ===
+        progress_frame = ttk.LabelFrame(right_frame, text="Progression", padding=10)
+        progress_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        
+        progress_tree = ttk.Treeview(progress_frame, columns=("Device", "Status", "Lines", "Errors", "Time"),
+                                     show="headings", height=12)
+        progress_tree.pack(fill=tk.BOTH, expand=True)
+        for column, title, width in [("Device", "Équipement", 140), ("Status", "Statut", 160),
+                                     ("Lines", "Lignes", 70), ("Errors", "Erreurs", 70),
+                                     ("Time", "Durée (s)", 80)]:
+            progress_tree.heading(column, text=title)
+            progress_tree.column(column, width=width)
+        
+        summary_label = ttk.Label(right_frame, text="")
+        summary_label.pack(anchor=tk.W, pady=5)
+        
+        def start():
+            selected = [node_names[i] for i in device_list.curselection()]
+            if not selected:
+                messagebox.showwarning("Aucune sélection", "Veuillez sélectionner au moins un équipement.",
+                                       parent=window)
+                return
             
-            self.output_text.insert(tk.END, f"\n✓ Configuration de {device_name} terminée\n")
-            self.update_status(f"Configuration de {device_name} terminée")
+            try:
+                configs = self.map_device_configs(selected, source_var.get(), folder_var.get())
+            except ValueError as e:
+                messagebox.showerror("Erreur", str(e), parent=window)
+                return
             
-            connection.disconnect()
+            if not self.connect_to_cml() or not self.lab:
+                messagebox.showerror("Erreur", "Aucun lab actif. Veuillez d'abord créer un lab.", parent=window)
+                return
             
-        except Exception as e:
-            error_msg = f"✗ Erreur lors de la configuration: {str(e)}\n"
-            self.output_text.insert(tk.END, error_msg)
-            self.output_text.see(tk.END)
-            self.update_status(f"Erreur: {str(e)}")
+            progress_tree.delete(*progress_tree.get_children())
+            rows = {}
+            for name in selected:
+                status = "En attente" if name in configs else "Aucune configuration"
+                rows[name] = progress_tree.insert("", tk.END, values=(name, status, "", "", ""))
+            
+            thread = threading.Thread(target=self._multi_apply_thread,
+                                      args=(configs, progress_tree, rows, summary_label))
+            thread.daemon = True
+            thread.start()
+        
+        btn_frame = ttk.Frame(right_frame)
+        btn_frame.pack(fill=tk.X)
+        ttk.Button(btn_frame, text="Appliquer", command=start).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="Fermer", command=window.destroy).pack(side=tk.LEFT, padx=2)
+    
+    def map_device_configs(self, devices, source, folder=""):
+        """Associe à chaque équipement le texte de configuration à appliquer"""
+        if source == "editor":
+            config_text = self.config_text.get(1.0, "end-1c")
+            if not config_text.strip():
+                raise ValueError("La configuration de l'éditeur est vide.")
+            return {device: config_text for device in devices}
+        
+        if not folder or not os.path.isdir(folder):
+            raise ValueError("Veuillez choisir un dossier de configurations valide.")
+        
+        # Un fichier par équipement: <nom>.txt, <nom>.cfg ou <nom>.conf
+        files = {}
+        for file_name in os.listdir(folder):
+            base, ext = os.path.splitext(file_name)
+            if ext.lower() in (".txt", ".cfg", ".conf"):
+                files.setdefault(base, os.path.join(folder, file_name))
+        
+        configs = {}
+        for device in devices:
+            if device in files:
+                with open(files[device], 'r') as f:
+                    configs[device] = f.read()
+        return configs
+    
+    def _multi_apply_thread(self, configs, progress_tree, rows, summary_label):
+        """Thread pour appliquer les configurations en parallèle"""
+        start = time.time()
+        results = {}
+        
+        def set_row(name, status, lines="", errors="", elapsed=""):
+            self.ui_call(progress_tree.item, rows[name], values=(name, status, lines, errors, elapsed),
+                         key=(progress_tree, name))
+        
+        def apply_one(name):
+            set_row(name, "En cours...")
+            
+            def progress(sent, total):
+                set_row(name, f"En cours... {sent}/{total}")
+            
+            return self.push_device_config(name, configs[name], progress)
+        
+        self.log_output(f"\n=== Configuration de {len(configs)} équipement(s) ===\n")
+        with ThreadPoolExecutor(max_workers=self.get_max_workers()) as executor:
+            futures = {executor.submit(apply_one, name): name for name in configs}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    line_count, errors, elapsed = future.result()
+                except Exception as e:
+                    results[name] = False
+                    set_row(name, f"✗ {str(e)}")
+                    self.log_output(f"✗ {name}: {str(e)}\n")
+                else:
+                    results[name] = not errors
+                    status = "✓ Terminé" if not errors else "⚠ Terminé avec erreurs"
+                    set_row(name, status, line_count, len(errors), f"{elapsed:.1f}")
+                    self.log_output(f"{'✓' if not errors else '⚠'} {name}: {line_count} "
+                                    f"ligne(s), {len(errors)} erreur(s), {elapsed:.1f} s\n")
+                    for line_no, cmd, message in errors:
+                        self.log_output(f"    Ligne {line_no}: {cmd} -> {message}\n")
+                
+                done = len(results)
+                self.update_status(f"Configuration multi-équipements... {done}/{len(configs)}")
+        
+        succeeded = sum(1 for ok in results.values() if ok)
+        summary = (f"{succeeded}/{len(configs)} équipement(s) configuré(s) sans erreur, "
+                   f"{len(configs) - succeeded} en échec ou avec erreurs ({time.time() - start:.1f} s)")
+        self.ui_call(summary_label.config, text=summary)
+        self.log_output(summary + "\n")
+        self.update_status(summary)
+    
+    def parse_config_lines(self, config_text):
+        """Extrait les lignes à envoyer en mode configuration, avec leur numéro
+        
+        Les commentaires et les commandes de changement de mode (enable,
+        configure terminal, end, write memory) sont retirés: ils sont gérés
+        par le moteur de console.
+        """
+        mode_commands = {"enable", "configure terminal", "conf t", "config t", "end",
+                         "write memory", "write", "wr", "copy running-config startup-config"}
+        commands = []
+        for line_no, line in enumerate(config_text.split('\n'), 1):
+            cmd = line.rstrip()
+            if not cmd.strip() or cmd.strip().startswith("!"):
+                continue
+            if cmd.strip().lower() in mode_commands:
+                continue
+            commands.append((line_no, cmd))
+        return commands
+    
+    def send_command_raw(self, connection, command, timeout=30):
+        """Envoie une commande brute et attend le retour du prompt"""
+        return connection.send_command(command, timeout=timeout)
     
-    def send_command_raw(self, connection, command, wait_time=1.0):
-        """Envoie une commande brute à l'équipement"""
-        connection.write_channel(command + '\r')
-        time.sleep(wait_time)
-        output = connection.read_channel()
-        return output
+    def device_session(self, device_name, line=0, report_errors=True):
+        """Retourne une session console du pool pour l'équipement (context manager)"""
+        key = (self.lab.id, device_name, line)
+        return self.console_pool.session(
+            key, lambda: self.connect_to_device_console(device_name, report_errors, line))
     
-    def connect_to_device_console(self, device_name):
+    def connect_to_device_console(self, device_name, report_errors=True, line=0):
         """Établit une connexion console vers un équipement"""
         try:
             # Récupérer les identifiants
-            device_user = self.device_user_entry.get() if hasattr(self, 'device_user_entry') else "cisco"
-            device_pass = self.device_pass_entry.get() if hasattr(self, 'device_pass_entry') else "cisco"
+            device_user, device_pass = self.get_device_credentials()
             
             connection = ConnectHandler(
                 device_type='terminal_server',
@@ -1702,39 +4346,37 @@ Description:
                 session_timeout=120,
             )
 
-            # Initialisation
-            connection.write_channel('\r')
-            time.sleep(1)
+            console = ConsoleEngine(connection)
             
-            # Connexion à la console
-            connection.write_channel(f'open /{self.lab.title}/{device_name}/0\r')
-            time.sleep(3)
-
-            output = connection.read_channel()
+            # Initialisation: attendre le prompt du serveur de consoles
+            console.write('\r')
+            console.read_until((ConsoleEngine.SERVER,), timeout=5)
             
-            # Authentification
-            connection.write_channel('\r')
-            time.sleep(1)
-            connection.write_channel(device_user + '\r')
-            time.sleep(1)
-            connection.write_channel(device_pass + '\r')
-            time.sleep(2)
+            # Connexion à la console
+            console.write(f'open /{self.lab.title}/{device_name}/{line}\r')
             
-            output += connection.read_channel()
-
-            if '>' in output or '#' in output:
-                return connection
+            # Authentification pilotée par le prompt
+            if console.login(device_user, device_pass):
+                console.ensure_exec()
+                node = self.topology.nodes.get(device_name)
+                device_type = node.type if node else None
+                console.disable_paging("terminal pager 0" if device_type == "asav" else "terminal length 0")
+                return console
             else:
-                self.output_text.insert(tk.END, f"\n✗ Connexion échouée: {output[:100]}...\n")
+                output = console.last_output
+                console.disconnect()
+                if report_errors:
+                    self.log_output(f"\n✗ Connexion échouée: {output[-100:]}...\n")
                 return None
                 
         except Exception as e:
-            self.output_text.insert(tk.END, f"\n✗ Erreur de connexion: {str(e)}\n")
+            if report_errors:
+                self.log_output(f"\n✗ Erreur de connexion: {str(e)}\n")
             return None
     
     def clear_output(self):
         """Efface la zone de sortie"""
-        self.output_text.delete(1.0, tk.END)
+        self.output_log.clear()
     
     def load_config_file(self):
         """Charge une configuration depuis un fichier"""
@@ -1841,7 +4483,7 @@ Description:
     def _execute_test_command(self, device, command):
         """Exécute une commande de test"""
         if not self.connect_to_cml() or not self.lab:
-            self.test_output.insert(tk.END, "✗ Aucun lab actif. Veuillez d'abord créer un lab.\n")
+            self.log_test("✗ Aucun lab actif. Veuillez d'abord créer un lab.\n")
             return
         
         thread = threading.Thread(target=self._execute_test_thread, 
@@ -1852,34 +4494,539 @@ Description:
     def _execute_test_thread(self, device, command):
         """Thread pour exécuter les tests"""
         try:
-            self.test_output.insert(tk.END, f"\n=== Test: {device} ===\n")
-            self.test_output.insert(tk.END, f"Commande: {command}\n")
-            self.test_output.insert(tk.END, "-" * 50 + "\n")
+            self.log_test(f"\n=== Test: {device} ===\n")
+            self.log_test(f"Commande: {command}\n")
+            self.log_test("-" * 50 + "\n")
             
-            connection = self.connect_to_device_console(device)
-            if not connection:
-                self.test_output.insert(tk.END, "✗ Échec de connexion\n")
+            with self.device_session(device) as connection:
+                if not connection:
+                    self.log_test("✗ Échec de connexion\n")
+                    return
+                
+                # Exécuter la commande
+                output = self.send_command_raw(connection, command, timeout=120)
+                self.log_test(output + "\n")
+            
+            self.log_test("✓ Test terminé\n")
+            
+        except Exception as e:
+            self.log_test(f"✗ Erreur: {str(e)}\n")
+    
+    def run_test_matrix(self, devices, commands, on_result):
+        """Exécute chaque commande sur chaque équipement, en parallèle par équipement
+        
+        Les commandes d'un même équipement partagent sa session console et
+        s'exécutent dans l'ordre; les équipements sont traités par le pool
+        de workers. commands est une liste commune ou {équipement: liste}.
+        on_result(équipement, commande, statut, durée, sortie) est appelé une
+        fois pour chaque cellule; si un équipement échoue en cours de route,
+        seules les commandes non exécutées reçoivent l'erreur.
+        """
+        def run_device(device):
+            remaining = list(commands[device] if isinstance(commands, dict) else commands)
+            try:
+                with self.device_session(device, report_errors=False) as connection:
+                    if not connection:
+                        for command in remaining:
+                            on_result(device, command, "✗ Connexion échouée", 0.0, "")
+                        return
+                    
+                    while remaining:
+                        command = remaining[0]
+                        start = time.time()
+                        output = self.send_command_raw(connection, command, timeout=120)
+                        elapsed = time.time() - start
+                        if connection.timed_out:
+                            status = "✗ Délai dépassé"
+                        elif ConsoleEngine.CONFIG_ERROR.search(output):
+                            status = "✗ Erreur"
+                        else:
+                            status = "✓ OK"
+                        remaining.pop(0)
+                        on_result(device, command, status, elapsed, output)
+            except Exception as e:
+                for command in remaining:
+                    on_result(device, command, f"✗ {str(e)}", 0.0, "")
+        
+        with ThreadPoolExecutor(max_workers=self.get_max_workers()) as executor:
+            for future in as_completed([executor.submit(run_device, device) for device in devices]):
+                future.result()
+    
+    def show_test_matrix_window(self):
+        """Fenêtre de la matrice de tests équipements × commandes"""
+        if not self.topology.nodes:
+            messagebox.showwarning("Aucun équipement", "La topologie ne contient aucun équipement.")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Matrice de tests")
+        window.geometry("1000x700")
+        window.transient(self.root)
+        
+        top_frame = ttk.Frame(window)
+        top_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        # Équipements
+        device_frame = ttk.LabelFrame(top_frame, text="Équipements", padding=10)
+        device_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
+        
+        device_list = tk.Listbox(device_frame, selectmode=tk.EXTENDED, height=8, exportselection=False)
+        device_list.pack(fill=tk.BOTH, expand=True)
+        node_names = list(self.topology.nodes.keys())
+        for name in node_names:
+            device_list.insert(tk.END, name)
+        
+        ttk.Button(device_frame, text="Tout sélectionner",
+                  command=lambda: device_list.selection_set(0, tk.END)).pack(anchor=tk.W, pady=(5, 0))
+        
+        # Commandes
+        command_frame = ttk.LabelFrame(top_frame, text="Commandes (une par ligne)", padding=10)
+        command_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0))
+        
+        command_text = tk.Text(command_frame, height=8, width=40, font=("Courier", 9))
+        command_text.pack(fill=tk.BOTH, expand=True)
+        command_text.insert(tk.END, "show version\nshow ip interface brief\nshow ip route")
+        
+        # Résultats
+        results_pane = ttk.PanedWindow(window, orient=tk.VERTICAL)
+        results_pane.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        tree_frame = ttk.Frame(results_pane)
+        results_pane.add(tree_frame, weight=2)
+        
+        tree_scroll = ttk.Scrollbar(tree_frame)
+        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        columns = ("Device", "Command", "Status", "Time")
+        result_tree = ttk.Treeview(tree_frame, columns=columns, show="headings",
+                                   yscrollcommand=tree_scroll.set)
+        result_tree.pack(fill=tk.BOTH, expand=True)
+        tree_scroll.config(command=result_tree.yview)
+        
+        for column, title, width in [("Device", "Équipement", 150), ("Command", "Commande", 250),
+                                     ("Status", "Statut", 150), ("Time", "Durée (s)", 80)]:
+            result_tree.heading(column, text=title,
+                                command=lambda c=column: self.sort_treeview(result_tree, c, False))
+            result_tree.column(column, width=width)
+        
+        output_view = scrolledtext.ScrolledText(results_pane, wrap=tk.WORD, height=10, font=("Courier", 9))
+        results_pane.add(output_view, weight=1)
+        
+        outputs = {}
+        
+        def show_output(event=None):
+            selection = result_tree.selection()
+            if selection:
+                output_view.delete(1.0, tk.END)
+                output_view.insert(tk.END, outputs.get(selection[0], ""))
+        
+        result_tree.bind("<<TreeviewSelect>>", show_output)
+        
+        summary_label = ttk.Label(window, text="")
+        summary_label.pack(anchor=tk.W, padx=10)
+        
+        def start():
+            devices = [node_names[i] for i in device_list.curselection()]
+            # Une commande saisie deux fois n'est exécutée qu'une fois (ordre conservé)
+            commands = list(dict.fromkeys(line.strip() for line in command_text.get(1.0, tk.END).split('\n')
+                                          if line.strip()))
+            if not devices or not commands:
+                messagebox.showwarning("Sélection incomplète",
+                                       "Veuillez sélectionner des équipements et saisir des commandes.",
+                                       parent=window)
                 return
             
-            # Exécuter la commande
-            output = self.send_command_raw(connection, command, wait_time=3)
-            self.test_output.insert(tk.END, output + "\n")
-            self.test_output.see(tk.END)
+            if not self.connect_to_cml() or not self.lab:
+                messagebox.showerror("Erreur", "Aucun lab actif. Veuillez d'abord créer un lab.", parent=window)
+                return
             
-            connection.disconnect()
-            self.test_output.insert(tk.END, "✓ Test terminé\n")
+            result_tree.delete(*result_tree.get_children())
+            outputs.clear()
+            rows = {}
+            for device in devices:
+                for command in commands:
+                    rows[(device, command)] = result_tree.insert(
+                        "", tk.END, values=(device, command, "En attente", ""))
             
-        except Exception as e:
-            self.test_output.insert(tk.END, f"✗ Erreur: {str(e)}\n")
+            thread = threading.Thread(target=self._test_matrix_thread,
+                                      args=(devices, commands, result_tree, rows, outputs, summary_label))
+            thread.daemon = True
+            thread.start()
+        
+        btn_frame = ttk.Frame(window)
+        btn_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(btn_frame, text="Exécuter la matrice", command=start).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="Fermer", command=window.destroy).pack(side=tk.LEFT, padx=2)
+    
+    def _test_matrix_thread(self, devices, commands, result_tree, rows, outputs, summary_label):
+        """Thread pour exécuter la matrice de tests"""
+        start = time.time()
+        total = len(devices) * len(commands)
+        counts = {"done": 0, "ok": 0}
+        lock = threading.Lock()
+        
+        def on_result(device, command, status, elapsed, output):
+            item = rows[(device, command)]
+            outputs[item] = output
+            self.ui_call(result_tree.item, item, values=(device, command, status, f"{elapsed:.2f}"))
+            
+            self.log_test(f"\n=== Test: {device} ===\n")
+            self.log_test(f"Commande: {command}\n")
+            self.log_test("-" * 50 + "\n")
+            self.log_test(f"{output}\n{status}\n")
+            
+            with lock:
+                counts["done"] += 1
+                if status.startswith("✓"):
+                    counts["ok"] += 1
+                self.update_status(f"Matrice de tests... {counts['done']}/{total}")
+        
+        self.run_test_matrix(devices, commands, on_result)
+        
+        summary = (f"{counts['ok']}/{total} test(s) réussi(s) sur {len(devices)} équipement(s) "
+                   f"en {time.time() - start:.1f} s")
+        self.ui_call(summary_label.config, text=summary)
+        self.update_status(summary)
+    
+    # ===== MÉTHODES POUR LA JOIGNABILITÉ =====
+    
+    def discover_interface_addresses(self, devices):
+        """Relève les adresses IPv4 des interfaces de chaque équipement
+        
+        Seuls les équipements avec une console interactive (Cisco ou Linux)
+        sont interrogés, en parallèle: 'show ip interface brief' sur IOS,
+        'show interface ip brief' sur ASA, 'ip -4 -o addr show' sur Linux.
+        Retourne {équipement: {interface: adresse}} pour ces équipements.
+        """
+        commands = {}
+        for device in devices:
+            node = self.topology.nodes.get(device)
+            if node is None:
+                continue
+            if node.type in self.linux_types:
+                commands[device] = ["ip -4 -o addr show"]
+            elif node.type == "asav":
+                # L'ASA n'a pas 'show ip interface brief'
+                commands[device] = ["show interface ip brief"]
+            elif node.type in self.console_prompt_types:
+                commands[device] = ["show ip interface brief"]
+        addresses = {device: {} for device in commands}
+        
+        def on_result(device, command, status, elapsed, output):
+            for line in output.split('\n'):
+                # Linux: "2: eth0    inet 10.0.0.1/24 brd ..."
+                match = re.search(r'^\d+:\s+(\S+)\s+inet\s+([\d.]+)/', line)
+                if match:
+                    interface, address = match.groups()
+                else:
+                    fields = line.split()
+                    if len(fields) < 2:
+                        continue
+                    interface, address = fields[0], fields[1]
+                try:
+                    address = ipaddress.IPv4Address(address)
+                except ValueError:
+                    continue
+                if not address.is_loopback:
+                    addresses[device][interface] = str(address)
+        
+        self.run_test_matrix(list(commands), commands, on_result)
+        return addresses
+    
+    def build_ping_jobs(self, mode, addresses):
+        """Génère les pings à effectuer: {source: [(destination, adresse)]}
+        
+        En mode 'links', chaque lien est testé dans les deux sens; sinon
+        chaque paire ordonnée d'équipements est testée. L'adresse cible est
+        celle de la destination la plus proche (plus long préfixe commun)
+        d'une adresse de la source.
+        """
+        def best_address(source, dest):
+            candidates = list(addresses.get(dest, {}).values())
+            if not candidates:
+                return None
+            own = [int(ipaddress.IPv4Address(a)) for a in addresses.get(source, {}).values()]
+            if not own:
+                return candidates[0]
+            
+            def common_prefix(address):
+                value = int(ipaddress.IPv4Address(address))
+                return max(32 - (value ^ mine).bit_length() for mine in own)
+            
+            return max(candidates, key=common_prefix)
+        
+        if mode == "links":
+            pairs = []
+            for link in self.topology.links.values():
+                pairs.append((link.source, link.dest))
+                pairs.append((link.dest, link.source))
+        else:
+            devices = list(addresses.keys())
+            pairs = [(a, b) for a in devices for b in devices if a != b]
+        
+        jobs = {}
+        seen = set()
+        for source, dest in pairs:
+            if (source, dest) in seen or source not in addresses or dest not in addresses:
+                continue
+            seen.add((source, dest))
+            address = best_address(source, dest)
+            if address:
+                jobs.setdefault(source, []).append((dest, address))
+        return jobs
+    
+    def parse_ping_output(self, output):
+        """Extrait (taux de succès %, rtt min, avg, max) d'une sortie de ping IOS ou Linux"""
+        match = re.search(r'Success rate is (\d+) percent \((\d+)/(\d+)\)'
+                          r'(?:, round-trip min/avg/max = (\d+)/(\d+)/(\d+) ms)?', output)
+        if match:
+            rtt = tuple(float(v) for v in match.group(4, 5, 6)) if match.group(4) else (None, None, None)
+            return (int(match.group(1)),) + rtt
+        
+        match = re.search(r'(\d+) packets transmitted, (\d+) (?:packets )?received', output)
+        if match:
+            sent, received = int(match.group(1)), int(match.group(2))
+            rate = int(100 * received / sent) if sent else 0
+            rtt_match = re.search(r'min/avg/max(?:/mdev)? = ([\d.]+)/([\d.]+)/([\d.]+)', output)
+            rtt = tuple(float(v) for v in rtt_match.groups()) if rtt_match else (None, None, None)
+            return (rate,) + rtt
+        
+        return None
+    
+    def run_ping_jobs(self, jobs, repeat, timeout, on_result):
+        """Exécute les pings, en série par équipement source et en parallèle entre sources
+        
+        on_result(source, destination, adresse, résultat) reçoit le tuple de
+        parse_ping_output, ou None si la sortie n'a pas pu être interprétée.
+        Si la console d'une source échoue, ses pings restants reçoivent None
+        et les autres sources continuent.
+        """
+        def run_source(source):
+            node = self.topology.nodes.get(source)
+            is_linux = node is not None and node.type in self.linux_types
+            remaining = list(jobs[source])
+            try:
+                with self.device_session(source, report_errors=False) as connection:
+                    if not connection:
+                        return
+                    
+                    while remaining:
+                        dest, address = remaining[0]
+                        if is_linux:
+                            command = f"ping -c {repeat} -W {timeout} {address}"
+                        else:
+                            command = f"ping {address} repeat {repeat} timeout {timeout}"
+                        output = self.send_command_raw(connection, command, timeout=repeat * timeout + 10)
+                        remaining.pop(0)
+                        on_result(source, dest, address, self.parse_ping_output(output))
+            except Exception as e:
+                self.log_test(f"✗ Pings depuis {source} interrompus: {str(e)}\n")
+            finally:
+                for dest, address in remaining:
+                    on_result(source, dest, address, None)
+        
+        with ThreadPoolExecutor(max_workers=self.get_max_workers()) as executor:
+            futures = [executor.submit(run_source, source) for source in jobs]
+            for future in as_completed(futures):
+                future.result()
+    
+    def show_reachability_window(self):
+        """Fenêtre de la matrice de joignabilité (ping) entre équipements"""
+        if not self.topology.nodes:
+            messagebox.showwarning("Aucun équipement", "La topologie ne contient aucun équipement.")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Matrice de joignabilité")
+        window.geometry("900x750")
+        window.transient(self.root)
+        
+        param_frame = ttk.LabelFrame(window, text="Paramètres", padding=10)
+        param_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        mode_var = tk.StringVar(value="links")
+        ttk.Radiobutton(param_frame, text="Par lien", variable=mode_var,
+                       value="links").grid(row=0, column=0, sticky=tk.W, padx=5)
+        ttk.Radiobutton(param_frame, text="Toutes les paires", variable=mode_var,
+                       value="all").grid(row=0, column=1, sticky=tk.W, padx=5)
+        
+        ttk.Label(param_frame, text="Paquets:").grid(row=0, column=2, padx=(20, 5))
+        repeat_entry = ttk.Entry(param_frame, width=5)
+        repeat_entry.grid(row=0, column=3)
+        repeat_entry.insert(0, "2")
+        
+        ttk.Label(param_frame, text="Délai (s):").grid(row=0, column=4, padx=(20, 5))
+        timeout_entry = ttk.Entry(param_frame, width=5)
+        timeout_entry.grid(row=0, column=5)
+        timeout_entry.insert(0, "1")
+        
+        status_label = ttk.Label(window, text="")
+        status_label.pack(anchor=tk.W, padx=10)
+        
+        # Canvas de la matrice
+        canvas_frame = ttk.Frame(window)
+        canvas_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        h_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL)
+        h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        v_scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL)
+        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        matrix_canvas = tk.Canvas(canvas_frame, bg="white",
+                                  xscrollcommand=h_scrollbar.set, yscrollcommand=v_scrollbar.set)
+        matrix_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        h_scrollbar.config(command=matrix_canvas.xview)
+        v_scrollbar.config(command=matrix_canvas.yview)
+        
+        detail_label = ttk.Label(window, text="Survolez une cellule pour le détail")
+        detail_label.pack(anchor=tk.W, padx=10)
+        
+        # Légende
+        legend_canvas = tk.Canvas(window, height=30, bg="white")
+        legend_canvas.pack(fill=tk.X, padx=10, pady=(0, 5))
+        x_pos = 10
+        for text, color in [("100 %", "#06D6A0"), ("Partiel", "#FFD166"),
+                            ("0 %", "#FF6B6B"), ("Non testé", "#DDDDDD")]:
+            legend_canvas.create_rectangle(x_pos, 8, x_pos + 14, 22, fill=color, outline="black")
+            legend_canvas.create_text(x_pos + 20, 15, text=text, anchor=tk.W)
+            x_pos += 110
+        
+        def start():
+            try:
+                repeat = max(1, int(repeat_entry.get()))
+                timeout = max(1, int(timeout_entry.get()))
+            except ValueError:
+                messagebox.showerror("Erreur", "Paquets et délai doivent être des nombres.", parent=window)
+                return
+            
+            if mode_var.get() == "links" and not self.topology.links:
+                messagebox.showwarning("Aucune connexion", "La topologie ne contient aucune connexion.",
+                                       parent=window)
+                return
+            
+            if not self.connect_to_cml() or not self.lab:
+                messagebox.showerror("Erreur", "Aucun lab actif. Veuillez d'abord créer un lab.", parent=window)
+                return
+            
+            thread = threading.Thread(target=self._reachability_thread,
+                                      args=(mode_var.get(), repeat, timeout, matrix_canvas,
+                                            status_label, detail_label))
+            thread.daemon = True
+            thread.start()
+        
+        btn_frame = ttk.Frame(window)
+        btn_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(btn_frame, text="Lancer", command=start).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="Fermer", command=window.destroy).pack(side=tk.LEFT, padx=2)
+    
+    def _reachability_thread(self, mode, repeat, timeout, matrix_canvas, status_label, detail_label):
+        """Thread pour construire la matrice de joignabilité"""
+        start = time.time()
+        devices = list(self.topology.nodes.keys())
+        
+        self.ui_call(status_label.config, text="Relevé des adresses des interfaces...", key=status_label)
+        addresses = self.discover_interface_addresses(devices)
+        jobs = self.build_ping_jobs(mode, addresses)
+        total = sum(len(targets) for targets in jobs.values())
+        
+        details = {}
+        cells = self.ui.run_sync(self.draw_reachability_matrix, matrix_canvas, devices, details, detail_label)
+        for source, targets in jobs.items():
+            for dest, address in targets:
+                self.ui_call(matrix_canvas.itemconfig, cells[(source, dest)], fill="#EEEEEE")
+        
+        lock = threading.Lock()
+        counts = {"done": 0, "ok": 0}
+        
+        def on_result(source, dest, address, result):
+            if result is None:
+                color, detail = "#FF6B6B", f"{source} -> {dest} ({address}): sortie non reconnue"
+            else:
+                rate, rtt_min, rtt_avg, rtt_max = result
+                color = "#06D6A0" if rate == 100 else "#FFD166" if rate > 0 else "#FF6B6B"
+                detail = f"{source} -> {dest} ({address}): {rate} %"
+                if rtt_avg is not None:
+                    detail += f", rtt min/avg/max = {rtt_min:g}/{rtt_avg:g}/{rtt_max:g} ms"
+            
+            cell = cells[(source, dest)]
+            self.ui_call(matrix_canvas.itemconfig, cell, fill=color)
+            details[cell] = detail
+            
+            with lock:
+                counts["done"] += 1
+                if result and result[0] == 100:
+                    counts["ok"] += 1
+                self.ui_call(status_label.config, text=f"Pings: {counts['done']}/{total}", key=status_label)
+        
+        self.run_ping_jobs(jobs, repeat, timeout, on_result)
+        
+        no_address = [d for d in devices if not addresses.get(d)]
+        summary = (f"{counts['ok']}/{total} ping(s) à 100 % en {time.time() - start:.1f} s")
+        if no_address:
+            summary += f" - sans adresse: {', '.join(no_address[:10])}"
+            if len(no_address) > 10:
+                summary += "..."
+        self.ui_call(status_label.config, text=summary, key=status_label)
+        self.update_status(summary)
+    
+    def draw_reachability_matrix(self, matrix_canvas, devices, details, detail_label):
+        """Dessine la grille N×N vide et retourne {(source, destination): cellule}
+        
+        details associe à chaque cellule le texte affiché au survol.
+        """
+        matrix_canvas.delete("all")
+        
+        cell_size = 18
+        margin = 10 + 7 * max(len(d) for d in devices)
+        cells = {}
+        
+        for i, device in enumerate(devices):
+            y = margin + i * cell_size + cell_size / 2
+            x = margin + i * cell_size + cell_size / 2
+            matrix_canvas.create_text(margin - 5, y, text=device, anchor=tk.E, font=("Arial", 8))
+            matrix_canvas.create_text(x, margin - 5, text=device, anchor=tk.W, angle=90, font=("Arial", 8))
+        
+        for i, source in enumerate(devices):
+            for j, dest in enumerate(devices):
+                x1 = margin + j * cell_size
+                y1 = margin + i * cell_size
+                cell = matrix_canvas.create_rectangle(x1, y1, x1 + cell_size, y1 + cell_size,
+                                                      fill="#DDDDDD", outline="white")
+                cells[(source, dest)] = cell
+        
+        def show_detail(event):
+            current = matrix_canvas.find_withtag("current")
+            if current:
+                detail_label.config(text=details.get(current[0], ""))
+        
+        matrix_canvas.tag_bind("all", "<Enter>", show_detail)
+        matrix_canvas.configure(scrollregion=matrix_canvas.bbox("all"))
+        return cells
+    
+    def sort_treeview(self, tree, column, reverse):
+        """Trie un Treeview sur une colonne (numérique si possible)"""
+        items = [(tree.set(item, column), item) for item in tree.get_children("")]
+        
+        def sort_key(entry):
+            try:
+                return (0, float(entry[0]), "")
+            except ValueError:
+                return (1, 0.0, entry[0].lower())
+        
+        items.sort(key=sort_key, reverse=reverse)
+        for index, (_, item) in enumerate(items):
+            tree.move(item, "", index)
+        
+        # Le prochain clic inverse l'ordre
+        tree.heading(column, command=lambda: self.sort_treeview(tree, column, not reverse))
     
     def clear_test_results(self):
         """Efface les résultats des tests"""
-        self.test_output.delete(1.0, tk.END)
+        self.test_log.clear()
     
     def export_test_results(self):
         """Exporte les résultats des tests"""
-        results = self.test_output.get(1.0, tk.END).strip()
-        if not results:
+        if self.test_log.is_empty():
             messagebox.showwarning("Résultats vides", "Aucun résultat à exporter.")
             return
         
@@ -1890,8 +5037,7 @@ Description:
         
         if file_path:
             try:
-                with open(file_path, 'w') as f:
-                    f.write(results)
+                self.test_log.export(file_path)
                 messagebox.showinfo("Succès", f"Résultats exportés vers {file_path}")
             except Exception as e:
                 messagebox.showerror("Erreur", f"Erreur lors de l'export: {str(e)}")
@@ -1904,8 +5050,15 @@ Description:
             "controller": self.controller_entry.get(),
             "username": self.username_entry.get(),
             "password": self.password_entry.get(),
-            "lab_name": self.lab_name_entry.get()
+            "lab_name": self.lab_name_entry.get(),
+            "max_workers": self.get_max_workers(),
+            "boot_timeout": self.get_boot_timeout(),
+            "console_idle_ttl": self.get_console_idle_ttl(),
+            "log_max_lines": self.get_log_max_lines(),
+            "bulk_import": self.bulk_import_var.get()
         }
+        self.console_pool.idle_ttl = self.cml_config["console_idle_ttl"]
+        self.apply_log_max_lines()
         
         try:
             with open("cml_settings.json", "w") as f:
@@ -1938,8 +5091,15 @@ Description:
                 "controller": "10.10.20.161",
                 "username": "developer",
                 "password": "C1sco12345",
-                "lab_name": "CML Automation Lab"
+                "lab_name": "CML Automation Lab",
+                "max_workers": 8,
+                "boot_timeout": 600,
+                "console_idle_ttl": 300,
+                "log_max_lines": 2000,
+                "bulk_import": True
             }
+            self.console_pool.idle_ttl = self.cml_config["console_idle_ttl"]
+            self.apply_log_max_lines()
             
             self.controller_entry.delete(0, tk.END)
             self.controller_entry.insert(0, self.cml_config["controller"])
@@ -1949,6 +5109,15 @@ Description:
             self.password_entry.insert(0, self.cml_config["password"])
             self.lab_name_entry.delete(0, tk.END)
             self.lab_name_entry.insert(0, self.cml_config["lab_name"])
+            self.max_workers_entry.delete(0, tk.END)
+            self.max_workers_entry.insert(0, str(self.cml_config["max_workers"]))
+            self.boot_timeout_entry.delete(0, tk.END)
+            self.boot_timeout_entry.insert(0, str(self.cml_config["boot_timeout"]))
+            self.console_ttl_entry.delete(0, tk.END)
+            self.console_ttl_entry.insert(0, str(self.cml_config["console_idle_ttl"]))
+            self.log_lines_entry.delete(0, tk.END)
+            self.log_lines_entry.insert(0, str(self.cml_config["log_max_lines"]))
+            self.bulk_import_var.set(self.cml_config["bulk_import"])
             
             self.device_user_entry.delete(0, tk.END)
             self.device_user_entry.insert(0, "cisco")
@@ -1964,6 +5133,8 @@ Description:
                 with open("cml_settings.json", "r") as f:
                     saved_config = json.load(f)
                     self.cml_config.update(saved_config)
+                    self.console_pool.idle_ttl = self.cml_config["console_idle_ttl"]
+                    self.apply_log_max_lines()
                     
                     if hasattr(self, 'controller_entry'):
                         self.controller_entry.delete(0, tk.END)
@@ -1974,6 +5145,15 @@ Description:
                         self.password_entry.insert(0, self.cml_config["password"])
                         self.lab_name_entry.delete(0, tk.END)
                         self.lab_name_entry.insert(0, self.cml_config["lab_name"])
+                        self.max_workers_entry.delete(0, tk.END)
+                        self.max_workers_entry.insert(0, str(self.cml_config["max_workers"]))
+                        self.boot_timeout_entry.delete(0, tk.END)
+                        self.boot_timeout_entry.insert(0, str(self.cml_config["boot_timeout"]))
+                        self.console_ttl_entry.delete(0, tk.END)
+                        self.console_ttl_entry.insert(0, str(self.cml_config["console_idle_ttl"]))
+                        self.log_lines_entry.delete(0, tk.END)
+                        self.log_lines_entry.insert(0, str(self.cml_config["log_max_lines"]))
+                        self.bulk_import_var.set(self.cml_config["bulk_import"])
         except:
             pass
     
@@ -1981,70 +5161,444 @@ Description:
     
     def create_and_start_lab(self):
         """Crée et démarre le lab dans CML"""
-        if not self.nodes:
+        if not self.topology.nodes:
             messagebox.showerror("Erreur", "Aucun équipement défini. Veuillez ajouter des équipements.")
             return
         
         if not self.connect_to_cml():
             return
         
-        thread = threading.Thread(target=self.cleanup_and_create_lab)
+        thread = threading.Thread(target=self.cleanup_and_create_lab,
+                                  args=(self.lab_name_entry.get(), self.bulk_import_var.get()))
         thread.daemon = True
         thread.start()
     
-    def cleanup_and_create_lab(self):
+    def cleanup_and_create_lab(self, lab_name, bulk_import):
         """Nettoyage et création du lab (thread)"""
         try:
             self.update_status("Nettoyage des labs existants...")
-            lab_name = self.lab_name_entry.get()
-            
-            # Nettoyer les labs existants avec le même nom
-            for existing_lab in self.cml_client.all_labs():
-                if existing_lab.title == lab_name:
-                    if existing_lab.state == 'STARTED':
-                        existing_lab.stop()
-                        while existing_lab.state != 'STOPPED':
-                            time.sleep(5)
-                    existing_lab.wipe()
-                    existing_lab.remove()
             
-            self.update_status("Création du lab...")
-            
-            # Créer le lab
-            self.lab = self.cml_client.create_lab(lab_name)
+            # Nettoyer les labs existants avec le même nom, en parallèle
+            collector = self.lab_collector()
+            existing = [lab for lab in self.cml_client.all_labs() if lab.title == lab_name]
+            errors = [error for error in collector.collect(existing).values() if error]
+            if errors:
+                raise RuntimeError(f"nettoyage impossible: {errors[0]}")
             
-            # Créer les nœuds
-            for node_name, node_info in self.nodes.items():
-                self.lab.create_node(node_name, node_info["type"])
-                time.sleep(0.5)
+            self.update_status("Création du lab...")
             
-            # Créer les connexions
-            for conn in self.connections:
+            failures = None
+            timings = []
+            if bulk_import:
+                # Tout le lab en une seule requête d'import
+                started = time.perf_counter()
                 try:
-                    source_node = self.lab.get_node_by_label(conn["source"])
-                    dest_node = self.lab.get_node_by_label(conn["dest"])
-                    
-                    if source_node and dest_node:
-                        self.lab.create_link(
-                            self.lab.create_interface(source_node, conn["port_s"]),
-                            self.lab.create_interface(dest_node, conn["port_d"])
-                        )
-                        time.sleep(0.5)
+                    self.lab = self.cml_client.import_lab(json.dumps(self.build_lab_document(lab_name)),
+                                                          title=lab_name)
+                    failures = []
+                    timings.append(f"import {time.perf_counter() - started:.1f} s")
                 except Exception as e:
-                    self.update_status(f"Erreur connexion {conn['source']}-{conn['dest']}: {str(e)}")
+                    timings.append(f"import échoué {time.perf_counter() - started:.1f} s")
+                    self.log_output(f"Import de topologie impossible ({str(e)}), "
+                                    f"création objet par objet\n")
+                    # Un import partiel ne doit pas laisser de doublon
+                    for existing_lab in self.cml_client.all_labs():
+                        if existing_lab.title == lab_name:
+                            existing_lab.remove()
+            
+            if failures is None:
+                # Créer les nœuds et les connexions en parallèle, un appel par objet
+                started = time.perf_counter()
+                self.lab = self.cml_client.create_lab(lab_name)
+                failures = self.build_lab_objects(self.lab, self.get_max_workers())
+                timings.append(f"objet par objet {time.perf_counter() - started:.1f} s")
+            
+            self.update_status(f"Lab créé ({', '.join(timings)}), démarrage...")
+            
+            # Démarrer le lab sans attendre la convergence: wait_for_lab_ready
+            # suit chaque nœud avec son propre délai et mesure sa disponibilité
+            self.lab.start(wait=False)
+            readiness = self.wait_for_lab_ready(self.lab)
+            self.report_lab_readiness(readiness)
+            
+            not_ready = [label for label, (ready, _, _) in readiness.items() if not ready]
+            failures += [f"Nœud {label}: {readiness[label][2]}" for label in not_ready]
+            
+            if failures:
+                details = "\n".join(failures[:15])
+                if len(failures) > 15:
+                    details += f"\n... et {len(failures) - 15} autre(s)"
+                self.update_status(f"Lab '{lab_name}' démarré avec {len(failures)} erreur(s) ({', '.join(timings)})")
+                self.ui_call(messagebox.showwarning, "Lab démarré avec erreurs",
+                             f"Lab '{lab_name}' démarré, mais {len(failures)} objet(s) "
+                             f"n'ont pas pu être créés:\n\n{details}")
+                return
+            
+            self.update_status(f"Lab '{lab_name}' créé et démarré avec succès ({', '.join(timings)})")
+            self.ui_call(messagebox.showinfo, "Succès", f"Lab '{lab_name}' créé et démarré avec succès!")
+            
+        except Exception as e:
+            self.update_status(f"Erreur: {str(e)}")
+            self.ui_call(messagebox.showerror, "Erreur", f"Erreur lors de la création du lab: {str(e)}")
+    
+    def update_existing_lab(self):
+        """Applique les modifications de la topologie au lab existant"""
+        if not self.topology.nodes:
+            messagebox.showerror("Erreur", "Aucun équipement défini. Veuillez ajouter des équipements.")
+            return
+        
+        if not self.connect_to_cml():
+            return
+        
+        thread = threading.Thread(target=self.reconcile_lab,
+                                  args=(self.lab_name_entry.get(), self.bulk_import_var.get()))
+        thread.daemon = True
+        thread.start()
+    
+    def read_lab_topology(self, lab):
+        """Nœuds {label: nœud} et liens {extrémités: lien} d'un lab CML
+        
+        Les extrémités utilisent les noms de ports du modèle, qui désigne un
+        port par le label de l'interface ou par son numéro de slot (entier
+        depuis l'interface graphique, texte depuis certains fichiers).
+        """
+        def local_port(interface):
+            node = interface.node.label
+            for port in (interface.label, interface.slot, str(interface.slot)):
+                if self.topology.port_in_use(node, port):
+                    return port
+            return interface.label
+        
+        nodes = {node.label: node for node in lab.nodes()}
+        links = {}
+        for link in lab.links():
+            a, b = link.interface_a, link.interface_b
+            links[frozenset(((a.node.label, local_port(a)), (b.node.label, local_port(b))))] = link
+        return nodes, links
+    
+    def reconcile_lab(self, lab_name, bulk_import):
+        """Met à jour le lab du même nom par différence avec le modèle (thread)
+        
+        Seuls les nœuds et liens manquants sont créés et ceux en trop
+        supprimés; les nœuds inchangés continuent de tourner. Sans lab
+        existant, le lab est créé complètement.
+        """
+        try:
+            lab = self.lab if self.lab is not None and self.lab.title == lab_name else None
+            if lab is None:
+                lab = next((l for l in self.cml_client.all_labs() if l.title == lab_name), None)
+            if lab is None:
+                self.update_status(f"Lab '{lab_name}' introuvable, création complète...")
+                self.cleanup_and_create_lab(lab_name, bulk_import)
+                return
+            self.lab = lab
+            
+            started = time.perf_counter()
+            self.update_status("Lecture du lab existant...")
+            remote_nodes, remote_links = self.read_lab_topology(lab)
+            diff = self.topology.diff({label: node.node_definition for label, node in remote_nodes.items()},
+                                      remote_links)
+            if not any(diff.values()):
+                self.update_status(f"Lab '{lab_name}' déjà à jour "
+                                   f"({time.perf_counter() - started:.1f} s)")
+                return
+            
+            failures = []
+            max_workers = self.get_max_workers()
+            
+            # Suppressions d'abord: elles libèrent les interfaces réutilisées
+            self.update_status(f"Mise à jour du lab: suppression de {len(diff['remove_links'])} lien(s) "
+                               f"et {len(diff['remove_nodes'])} nœud(s)...")
             
-            self.update_status("Démarrage du lab...")
+            collector = self.lab_collector()
             
-            # Démarrer le lab
-            self.lab.start()
-            time.sleep(60)  # Attendre le démarrage
+            def remove_node(node):
+                what = f"nœud {node.label}"
+                node.stop(wait=False)
+                collector.wait_for_state(lambda: node.state, LabCollector.STOPPED_STATES, what)
+                node.wipe(wait=False)
+                collector.wait_for_state(lambda: node.state, ("DEFINED_ON_CORE",), what)
+                lab.remove_node(node, wait=False)
             
-            self.update_status(f"Lab '{lab_name}' créé et démarré avec succès")
-            messagebox.showinfo("Succès", f"Lab '{lab_name}' créé et démarré avec succès!")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(lab.remove_link, remote_links[endpoints], wait=False):
+                           f"Lien {' - '.join(f'{n}:{p}' for n, p in sorted(endpoints))}"
+                           for endpoints in diff["remove_links"]}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failures.append(f"{futures[future]}: {str(e)}")
+                
+                futures = {executor.submit(remove_node, remote_nodes[label]): f"Nœud {label}"
+                           for label in diff["remove_nodes"]}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failures.append(f"{futures[future]}: {str(e)}")
+            
+            for label in diff["remove_nodes"]:
+                self.console_pool.close_node(lab.id, label)
+                del remote_nodes[label]
+            
+            # Créations: les liens vers des nœuds conservés réutilisent les nœuds existants
+            new_labels = set(diff["add_nodes"])
+            failures += self.build_lab_objects(lab, max_workers,
+                                               [(label, self.topology.nodes[label]) for label in diff["add_nodes"]],
+                                               diff["add_links"], existing=remote_nodes)
+            
+            readiness = {}
+            if new_labels:
+                self.update_status(f"Démarrage de {len(new_labels)} nouveau(x) nœud(s)...")
+                for node in lab.nodes():
+                    if node.label in new_labels:
+                        node.start()
+                readiness = self.wait_for_lab_ready(lab, labels=new_labels)
+                self.report_lab_readiness(readiness)
+                failures += [f"Nœud {label}: {detail}"
+                             for label, (ready, _, detail) in readiness.items() if not ready]
+            
+            # Contrôle: le lab mis à jour ne doit plus présenter d'écart avec le modèle
+            lab.sync(topology_only=True, exclude_configurations=True)
+            remote_nodes, remote_links = self.read_lab_topology(lab)
+            remaining = self.topology.diff({label: node.node_definition
+                                            for label, node in remote_nodes.items()}, remote_links)
+            if any(remaining.values()):
+                failures.append(f"Écart persistant après mise à jour: "
+                                f"+{len(remaining['add_nodes'])}/-{len(remaining['remove_nodes'])} nœud(s), "
+                                f"+{len(remaining['add_links'])}/-{len(remaining['remove_links'])} lien(s)")
+            
+            summary = (f"+{len(diff['add_nodes'])}/-{len(diff['remove_nodes'])} nœud(s), "
+                       f"+{len(diff['add_links'])}/-{len(diff['remove_links'])} lien(s) "
+                       f"en {time.perf_counter() - started:.1f} s")
+            if failures:
+                details = "\n".join(failures[:15])
+                if len(failures) > 15:
+                    details += f"\n... et {len(failures) - 15} autre(s)"
+                self.update_status(f"Lab '{lab_name}' mis à jour avec {len(failures)} erreur(s) ({summary})")
+                self.ui_call(messagebox.showwarning, "Lab mis à jour avec erreurs",
+                             f"Lab '{lab_name}' mis à jour, mais {len(failures)} opération(s) "
+                             f"ont échoué:\n\n{details}")
+                return
+            
+            self.update_status(f"Lab '{lab_name}' mis à jour: {summary}")
             
         except Exception as e:
             self.update_status(f"Erreur: {str(e)}")
-            messagebox.showerror("Erreur", f"Erreur lors de la création du lab: {str(e)}")
+            self.ui_call(messagebox.showerror, "Erreur", f"Erreur lors de la mise à jour du lab: {str(e)}")
+    
+    def build_lab_document(self, lab_name):
+        """Sérialise la topologie au format d'import de labo CML"""
+        return CMLLabFormat.build(lab_name, self.topology, self.layout_positions)
+    
+    def build_lab_objects(self, lab, max_workers, nodes=None, connections=None, existing=None):
+        """Crée les nœuds puis les liens du lab avec un pool de workers borné
+        
+        Les nœuds sont créés en parallèle avec les interfaces par défaut de
+        leur définition. La topologie est ensuite synchronisée une seule
+        fois pour indexer les interfaces par (nœud, label ou slot); les
+        slots manquants sont créés d'un coup par nœud, puis les liens sont
+        résolus depuis ces index. Par défaut toute la topologie est créée;
+        nodes/connections limitent la création à un sous-ensemble et
+        existing ({label: nœud CML}) fournit les extrémités déjà présentes
+        dans le lab. Retourne la liste des échecs, un message par objet.
+        """
+        if nodes is None:
+            nodes = list(self.topology.nodes.items())
+        if connections is None:
+            connections = list(self.topology.links.values())
+        total = len(nodes) + len(connections)
+        failures = []
+        created = dict(existing or {})
+        done = 0
+        
+        def report():
+            self.update_status(f"Création du lab... {done}/{total} objet(s), "
+                               f"{len(failures)} échec(s)")
+        
+        def create_node(node_name, record):
+            x, y = self.layout_positions.get(node_name, (0, 0))
+            options = {"configuration": record.configuration} if record.configuration else {}
+            # Interfaces par défaut de la définition de nœud créées avec le nœud;
+            # wait=False: pas d'attente de convergence du lab après chaque objet
+            return lab.create_node(node_name, record.type, int(round(x)), int(round(y)),
+                                   wait=False, populate_interfaces=True, **options)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(create_node, node_name, record): node_name
+                       for node_name, record in nodes}
+            for future in as_completed(futures):
+                node_name = futures[future]
+                done += 1
+                try:
+                    created[node_name] = future.result()
+                except Exception as e:
+                    failures.append(f"Nœud {node_name}: {str(e)}")
+                report()
+        
+        links = []
+        for conn in connections:
+            unavailable = [n for n in (conn.source, conn.dest) if n not in created]
+            if unavailable:
+                reason = ("équipement inconnu" if any(n not in self.topology.nodes for n in unavailable)
+                          else "nœud non créé")
+                failures.append(f"Connexion {conn.source}-{conn.dest}: {reason} {', '.join(unavailable)}")
+                done += 1
+            else:
+                links.append(conn)
+        if not links:
+            report()
+            return failures
+        
+        slots = CMLLabFormat.port_slots(self.topology, links)
+        
+        def index_interfaces():
+            # Un seul parcours des interfaces du lab, déjà synchronisées
+            index = {}
+            for intf in lab.interfaces():
+                mapping = index.setdefault(intf.node.label, {})
+                mapping[intf.label] = intf
+                mapping[intf.slot] = intf
+            return index
+        
+        lab.sync(topology_only=True, exclude_configurations=True)
+        interfaces = index_interfaces()
+        
+        # Slots absents des interfaces par défaut: CML crée aussi les slots intermédiaires
+        highest = {}
+        for conn in links:
+            for node_name, port in ((conn.source, conn.port_s), (conn.dest, conn.port_d)):
+                mapping = interfaces.get(node_name, {})
+                slot = slots[(node_name, port)]
+                if str(port) not in mapping and slot not in mapping:
+                    highest[node_name] = max(highest.get(node_name, slot), slot)
+        if highest:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(lab.create_interface, created[node_name], slot,
+                                           wait=False): node_name
+                           for node_name, slot in highest.items()}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failures.append(f"Interfaces {futures[future]}: {str(e)}")
+            interfaces = index_interfaces()
+        
+        def interface(node_name, port):
+            mapping = interfaces.get(node_name, {})
+            intf = mapping.get(str(port)) or mapping.get(slots[(node_name, port)])
+            if intf is None:
+                raise ValueError(f"interface {port} absente sur {node_name}")
+            return intf
+        
+        def create_link(conn):
+            return lab.create_link(interface(conn.source, conn.port_s),
+                                   interface(conn.dest, conn.port_d), wait=False)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(create_link, conn): conn for conn in links}
+            for future in as_completed(futures):
+                done += 1
+                try:
+                    future.result()
+                except Exception as e:
+                    conn = futures[future]
+                    failures.append(f"Connexion {conn.source}-{conn.dest}: {str(e)}")
+                report()
+        
+        return failures
+    
+    def wait_for_lab_ready(self, lab, labels=None, timeout=None):
+        """Attend que les nœuds du lab (ou un sous-ensemble) soient utilisables
+        
+        Les états sont synchronisés en un seul appel par tour, avec un
+        intervalle croissant. Dès qu'un nœud est BOOTED, son prompt console
+        est sondé dans le pool de workers. Retourne {label: (prêt, secondes,
+        détail)}.
+        """
+        if timeout is None:
+            timeout = self.get_boot_timeout()
+        
+        targets = {node.label: node for node in lab.nodes()
+                   if labels is None or node.label in labels}
+        results = {}
+        start = time.time()
+        interval = 0.5
+        
+        def probe_console(label):
+            deadline = start + timeout
+            while time.time() < deadline:
+                # La session ouverte reste dans le pool pour les tâches suivantes
+                with self.device_session(label, report_errors=False) as connection:
+                    if connection:
+                        return True, time.time() - start, "prompt console disponible"
+                time.sleep(2)
+            return False, time.time() - start, "prompt console absent (délai dépassé)"
+        
+        with ThreadPoolExecutor(max_workers=self.get_max_workers()) as executor:
+            probing = {}
+            while len(results) < len(targets):
+                try:
+                    lab.sync_states()
+                except Exception:
+                    pass
+                
+                elapsed = time.time() - start
+                for label, node in targets.items():
+                    if label in results or label in probing.values():
+                        continue
+                    
+                    state = node.state
+                    if state == "BOOTED":
+                        record = self.topology.nodes.get(label)
+                        node_type = record.type if record else node.node_definition
+                        if node_type in self.console_prompt_types:
+                            probing[executor.submit(probe_console, label)] = label
+                        else:
+                            results[label] = (True, elapsed, "BOOTED")
+                    elif elapsed > timeout:
+                        results[label] = (False, elapsed, f"délai dépassé (état {state})")
+                
+                for future in [f for f in probing if f.done()]:
+                    label = probing.pop(future)
+                    try:
+                        results[label] = future.result()
+                    except Exception as e:
+                        results[label] = (False, time.time() - start, str(e))
+                
+                ready_count = sum(1 for ready, _, _ in results.values() if ready)
+                self.update_status(f"Démarrage du lab... {ready_count}/{len(targets)} nœud(s) prêt(s) "
+                                   f"({int(elapsed)} s)")
+                
+                if len(results) < len(targets):
+                    time.sleep(interval)
+                    interval = min(interval * 1.5, 5)
+        
+        return results
+    
+    def report_lab_readiness(self, readiness):
+        """Affiche le temps de disponibilité de chaque nœud"""
+        self.log_output("\n=== Disponibilité des nœuds ===\n")
+        for label, (ready, seconds, detail) in sorted(readiness.items(), key=lambda item: item[1][1]):
+            mark = "✓" if ready else "✗"
+            self.log_output(f"{mark} {label}: {seconds:.1f} s - {detail}\n")
+    
+    def check_lab_readiness(self):
+        """Vérifie la disponibilité des nœuds du lab actif"""
+        if not self.lab:
+            messagebox.showerror("Erreur", "Aucun lab actif.")
+            return
+        
+        def run():
+            readiness = self.wait_for_lab_ready(self.lab)
+            self.report_lab_readiness(readiness)
+            ready_count = sum(1 for ready, _, _ in readiness.values() if ready)
+            self.update_status(f"{ready_count}/{len(readiness)} nœud(s) prêt(s)")
+        
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
     
     def stop_lab(self):
         """Arrête le lab actif"""
@@ -2054,6 +5608,7 @@ Description:
         
         try:
             self.lab.stop()
+            self.console_pool.close_lab(self.lab.id)
             self.update_status("Lab arrêté")
             messagebox.showinfo("Succès", "Lab arrêté avec succès.")
         except Exception as e:
@@ -2067,6 +5622,7 @@ Description:
         
         if messagebox.askyesno("Confirmation", "Êtes-vous sûr de vouloir supprimer le lab?"):
             try:
+                self.console_pool.close_lab(self.lab.id)
                 self.lab.wipe()
                 self.lab.remove()
                 self.lab = None
@@ -2075,65 +5631,168 @@ Description:
             except Exception as e:
                 messagebox.showerror("Erreur", f"Erreur lors de la suppression: {str(e)}")
     
-    def export_topology(self):
-        """Exporte la topologie dans un fichier JSON"""
-        topology = {
-            "nodes": self.nodes,
-            "connections": self.connections,
-            "lab_name": self.lab_name_entry.get()
-        }
+    def lab_collector(self):
+        """Moteur de suppression de labs, avec suivi dans la barre d'état"""
+        def on_progress(lab, step):
+            if step in ("arrêt", "effacement"):
+                self.console_pool.close_lab(lab.id)
+            self.update_status(f"Nettoyage: {lab.title} ({step})")
+        
+        return LabCollector(self.get_max_workers(), self.get_boot_timeout(), on_progress)
+    
+    def show_purge_window(self):
+        """Purge des labs dont le titre correspond à un motif, au-delà d'un âge"""
+        if not self.connect_to_cml():
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Purger les labs")
+        window.geometry("600x400")
+        window.transient(self.root)
+        
+        form = ttk.Frame(window, padding=10)
+        form.pack(fill=tk.X)
         
+        ttk.Label(form, text="Motif du titre:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        pattern_entry = ttk.Entry(form, width=30)
+        pattern_entry.grid(row=0, column=1, sticky=tk.W, padx=5, pady=2)
+        pattern_entry.insert(0, "*")
+        
+        ttk.Label(form, text="Âge minimal (heures):").grid(row=1, column=0, sticky=tk.W, pady=2)
+        age_entry = ttk.Entry(form, width=8)
+        age_entry.grid(row=1, column=1, sticky=tk.W, padx=5, pady=2)
+        age_entry.insert(0, "24")
+        
+        tree_frame = ttk.Frame(window)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        tree_scroll = ttk.Scrollbar(tree_frame)
+        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        labs_tree = ttk.Treeview(tree_frame, columns=("Title", "State", "Age"), show="headings",
+                                 yscrollcommand=tree_scroll.set)
+        labs_tree.pack(fill=tk.BOTH, expand=True)
+        tree_scroll.config(command=labs_tree.yview)
+        labs_tree.heading("Title", text="Titre")
+        labs_tree.heading("State", text="État")
+        labs_tree.heading("Age", text="Âge")
+        labs_tree.column("Title", width=300)
+        labs_tree.column("State", width=100)
+        labs_tree.column("Age", width=100)
+        
+        candidates = {}
+        
+        def search():
+            try:
+                min_age = float(age_entry.get() or 0) * 3600
+            except ValueError:
+                messagebox.showerror("Erreur", "Âge minimal invalide.", parent=window)
+                return
+            
+            labs_tree.delete(*labs_tree.get_children())
+            candidates.clear()
+            collector = self.lab_collector()
+            for lab in collector.matching(self.cml_client.all_labs(), pattern_entry.get() or "*", min_age):
+                age = collector.lab_age(lab)
+                age_text = "?" if age is None else f"{age / 3600:.1f} h"
+                iid = labs_tree.insert("", tk.END, values=(lab.title, collector.lab_state(lab), age_text))
+                candidates[iid] = lab
+            self.update_status(f"{len(candidates)} lab(s) à purger")
+        
+        def purge():
+            labs = [candidates[iid] for iid in (labs_tree.selection() or candidates)]
+            if not labs:
+                return
+            if not messagebox.askyesno("Confirmation", f"Supprimer définitivement {len(labs)} lab(s)?",
+                                       parent=window):
+                return
+            
+            lab_ids = {lab.id for lab in labs}
+            if self.lab is not None and self.lab.id in lab_ids:
+                self.lab = None
+            
+            def on_done(results):
+                errors = {lab_id: error for lab_id, error in results.items() if error}
+                self.update_status(f"Purge terminée: {len(results) - len(errors)} lab(s) supprimé(s), "
+                                   f"{len(errors)} erreur(s)")
+                for lab_id, error in errors.items():
+                    self.log_output(f"Purge du lab {lab_id} impossible: {error}\n")
+            
+            # La purge continue en arrière-plan, même si la fenêtre est fermée
+            self.lab_collector().collect_in_background(labs, on_done)
+            window.destroy()
+        
+        btn_frame = ttk.Frame(form)
+        btn_frame.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        ttk.Button(btn_frame, text="Rechercher", command=search).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="Purger (sélection ou tout)", command=purge).pack(side=tk.LEFT, padx=5)
+    
+    def export_topology(self):
+        """Exporte la topologie en JSON, ou au format de labo CML (YAML)"""
         file_path = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("JSON files", "*.json"), ("CML lab (YAML)", "*.yaml *.yml"),
+                       ("All files", "*.*")]
         )
         
         if file_path:
             try:
-                with open(file_path, 'w') as f:
-                    json.dump(topology, f, indent=4)
+                if file_path.lower().endswith((".yaml", ".yml")):
+                    CMLLabFormat.write(file_path, self.build_lab_document(self.lab_name_entry.get()))
+                else:
+                    topology = self.topology.to_dict()
+                    topology["lab_name"] = self.lab_name_entry.get()
+                    with open(file_path, 'w') as f:
+                        json.dump(topology, f, indent=4)
                 self.update_status(f"Topologie exportée vers {file_path}")
                 messagebox.showinfo("Succès", f"Topologie exportée vers {file_path}")
             except Exception as e:
                 messagebox.showerror("Erreur", f"Erreur lors de l'export: {str(e)}")
     
     def import_topology(self):
-        """Importe une topologie depuis un fichier JSON"""
+        """Importe une topologie depuis un fichier JSON ou un labo CML (YAML)"""
         file_path = filedialog.askopenfilename(
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("Topologies", "*.json *.yaml *.yml"), ("JSON files", "*.json"),
+                       ("CML lab (YAML)", "*.yaml *.yml"), ("All files", "*.*")]
         )
         
         if file_path:
             try:
-                with open(file_path, 'r') as f:
-                    topology = json.load(f)
-                
-                # Mettre à jour les données
-                self.nodes = topology.get("nodes", {})
-                self.connections = topology.get("connections", [])
-                
-                # Mettre à jour les combobox
-                device_names = list(self.nodes.keys())
-                self.source_device_combo['values'] = device_names
-                self.dest_device_combo['values'] = device_names
-                self.config_device_combo['values'] = device_names
-                self.test_device_combo['values'] = device_names
+                started = time.perf_counter()
+                if file_path.lower().endswith((".yaml", ".yml")):
+                    categories = {}
+                    for device in self.predefined_devices:
+                        categories.setdefault(device["type"], device["category"])
+                    lab_name, nodes, connections, positions = CMLLabFormat.parse(
+                        CMLLabFormat.read(file_path), categories)
+                    
+                    # Positions du labo conservées si le fichier en donne pour chaque nœud
+                    if positions and len(positions) == len(nodes):
+                        self.layout_generation += 1
+                        self.layout_positions = {name: (float(x), float(y))
+                                                 for name, (x, y) in positions.items()}
+                else:
+                    with open(file_path, 'r') as f:
+                        topology = json.load(f)
+                    lab_name = topology.get("lab_name")
+                    nodes = topology.get("nodes", {})
+                    connections = topology.get("connections", [])
                 
-                # Mettre à jour l'arbre des connexions
-                self.connections_tree.delete(*self.connections_tree.get_children())
-                for conn in self.connections:
-                    self.connections_tree.insert("", tk.END, 
-                                               values=(conn["source"], conn["port_s"], 
-                                                      conn["dest"], conn["port_d"]))
+                # Mettre à jour les données (combobox, arbre et canvas suivent via "reset")
+                skipped = self.topology.load(nodes, connections)
                 
                 # Mettre à jour le nom du lab
-                if "lab_name" in topology:
+                if lab_name:
                     self.lab_name_entry.delete(0, tk.END)
-                    self.lab_name_entry.insert(0, topology["lab_name"])
+                    self.lab_name_entry.insert(0, lab_name)
                 
-                self.update_status(f"Topologie importée depuis {file_path}")
-                self.refresh_visualization()
-                messagebox.showinfo("Succès", f"Topologie importée depuis {file_path}")
+                elapsed = time.perf_counter() - started
+                self.update_status(f"Topologie importée depuis {file_path} "
+                                   f"({len(nodes)} nœud(s), {elapsed:.2f} s)")
+                message = f"Topologie importée depuis {file_path}"
+                if skipped:
+                    message += "\n\nConnexion(s) ignorée(s):\n" + "\n".join(skipped[:20])
+                messagebox.showinfo("Succès", message)
             except Exception as e:
                 messagebox.showerror("Erreur", f"Erreur lors de l'import: {str(e)}")
     
@@ -2153,10 +5812,85 @@ Description:
                                f"Impossible de se connecter à CML:\n{str(e)}")
             return False
     
+    # Les accesseurs de réglages peuvent être appelés depuis n'importe quel
+    # thread: la lecture des widgets passe par la boucle Tk (run_sync)
+    
+    def get_max_workers(self):
+        """Retourne le nombre maximal d'appels parallèles vers CML"""
+        try:
+            value = int(self.ui.run_sync(self.max_workers_entry.get))
+        except (ValueError, AttributeError):
+            value = self.cml_config.get("max_workers", 8)
+        return max(1, value)
+    
+    def get_device_credentials(self):
+        """Retourne (utilisateur, mot de passe) des consoles des équipements"""
+        def read():
+            user = self.device_user_entry.get() if hasattr(self, 'device_user_entry') else "cisco"
+            password = self.device_pass_entry.get() if hasattr(self, 'device_pass_entry') else "cisco"
+            return user, password
+        return self.ui.run_sync(read)
+    
+    def get_bulk_push(self):
+        """Indique si les configurations sont envoyées par blocs de commandes"""
+        return bool(self.ui.run_sync(self.bulk_push_var.get))
+    
+    def get_boot_timeout(self):
+        """Retourne le délai maximal de démarrage d'un nœud, en secondes"""
+        try:
+            value = float(self.ui.run_sync(self.boot_timeout_entry.get))
+        except (ValueError, AttributeError):
+            value = self.cml_config.get("boot_timeout", 600)
+        return max(1, value)
+    
+    def get_console_idle_ttl(self):
+        """Retourne la durée d'inactivité avant fermeture d'une session console"""
+        try:
+            value = float(self.ui.run_sync(self.console_ttl_entry.get))
+        except (ValueError, AttributeError):
+            value = self.cml_config.get("console_idle_ttl", 300)
+        return max(1, value)
+    
+    def get_log_max_lines(self):
+        """Retourne le nombre de lignes conservées à l'écran dans les sorties"""
+        try:
+            value = int(self.ui.run_sync(self.log_lines_entry.get))
+        except (ValueError, AttributeError):
+            value = self.cml_config.get("log_max_lines", 2000)
+        return max(100, value)
+    
+    def apply_log_max_lines(self):
+        """Applique la limite de lignes affichées aux journaux de sortie"""
+        max_lines = self.cml_config.get("log_max_lines", 2000)
+        self.output_log.max_lines = max_lines
+        self.test_log.max_lines = max_lines
+    
+    def on_close(self):
+        """Ferme les sessions console et les journaux avant de quitter"""
+        self.console_pool.close_all()
+        self.root.destroy()
+        self.output_log.close()
+        self.test_log.close()
+    
+    def log_output(self, text):
+        """Ajoute du texte à la sortie de configuration (depuis n'importe quel thread)"""
+        self.ui.post_text(self.output_log, text)
+    
+    def log_test(self, text):
+        """Ajoute du texte aux résultats de test (depuis n'importe quel thread)"""
+        self.ui.post_text(self.test_log, text)
+    
+    def ui_call(self, func, *args, key=None, **kwargs):
+        """Exécute un appel Tk dans la boucle principale (depuis n'importe quel thread)"""
+        self.ui.call(func, *args, key=key, **kwargs)
+    
     def update_status(self, message):
-        """Met à jour la barre de statut"""
-        self.status_bar.config(text=f"Statut: {message}")
-        self.root.update()
+        """Met à jour la barre de statut (depuis n'importe quel thread)"""
+        if self.ui.in_main_thread():
+            self.status_bar.config(text=f"Statut: {message}")
+            self.status_bar.update_idletasks()
+        else:
+            self.ui_call(self.status_bar.config, text=f"Statut: {message}", key="status")
 
 def main():
     root = tk.Tk()